@@ -11,6 +11,8 @@ import math
 import torch
 from torch import nn
 
+is_sdpa_available = hasattr(torch.nn.functional, "scaled_dot_product_attention")
+
 
 class MultiHeadedAttention(nn.Module):
     """Multi-Head Attention layer.
@@ -35,6 +37,9 @@ class MultiHeadedAttention(nn.Module):
         self.linear_out = nn.Linear(n_feat, n_feat)
         self.attn = None
         self.dropout = nn.Dropout(p=dropout_rate)
+        # NOTE: if True, use fused scaled_dot_product_attention (torch>=2.0),
+        #   which does not store the attention weights in self.attn
+        self.use_sdpa = False
 
     def forward_qkv(self, query, key, value):
         """Transform query, key and value.
@@ -92,6 +97,42 @@ class MultiHeadedAttention(nn.Module):
 
         return self.linear_out(x)  # (batch, time1, d_model)
 
+    def forward_attention_sdpa(self, query, key, value, mask, bias=None):
+        """Compute attention context vector with fused scaled dot product attention.
+
+        Args:
+            query (torch.Tensor): Transformed query (#batch, n_head, time1, d_k).
+            key (torch.Tensor): Transformed key (#batch, n_head, time2, d_k).
+            value (torch.Tensor): Transformed value (#batch, n_head, time2, d_k).
+            mask (torch.Tensor): Mask (#batch, 1, time2) or (#batch, time1, time2).
+            bias (torch.Tensor): Additive score bias already scaled by 1 / sqrt(d_k)
+                (#batch, n_head, time1, time2).
+
+        Returns:
+            torch.Tensor: Transformed value (#batch, time1, d_model).
+
+        """
+        n_batch = value.size(0)
+        attn_mask = bias
+        if mask is not None:
+            mask = mask.unsqueeze(1).eq(0)  # (batch, 1, *, time2)
+            if bias is None:
+                attn_mask = ~mask
+            else:
+                attn_mask = bias.masked_fill(mask, torch.finfo(bias.dtype).min)
+        x = torch.nn.functional.scaled_dot_product_attention(
+            query,
+            key,
+            value,
+            attn_mask=attn_mask,
+            dropout_p=self.dropout.p if self.training else 0.0,
+        )  # (batch, head, time1, d_k)
+        x = (
+            x.transpose(1, 2).contiguous().view(n_batch, -1, self.h * self.d_k)
+        )  # (batch, time1, d_model)
+
+        return self.linear_out(x)  # (batch, time1, d_model)
+
     def forward(self, query, key, value, mask):
         """Compute scaled dot product attention.
 
@@ -107,6 +148,8 @@ class MultiHeadedAttention(nn.Module):
 
         """
         q, k, v = self.forward_qkv(query, key, value)
+        if self.use_sdpa:
+            return self.forward_attention_sdpa(q, k, v, mask)
         scores = torch.matmul(q, k.transpose(-2, -1)) / math.sqrt(self.d_k)
         return self.forward_attention(v, scores, mask)
 
@@ -188,17 +231,23 @@ class LegacyRelPositionMultiHeadedAttention(MultiHeadedAttention):
         # (batch, head, time1, d_k)
         q_with_bias_v = (q + self.pos_bias_v).transpose(1, 2)
 
+        # compute matrix b and matrix d
+        # (batch, head, time1, time1)
+        matrix_bd = torch.matmul(q_with_bias_v, p.transpose(-2, -1))
+        matrix_bd = self.rel_shift(matrix_bd)
+
+        if self.use_sdpa:
+            # matrix a and matrix c are computed inside the fused kernel
+            return self.forward_attention_sdpa(
+                q_with_bias_u, k, v, mask, bias=matrix_bd / math.sqrt(self.d_k)
+            )
+
         # compute attention score
         # first compute matrix a and matrix c
         # as described in https://arxiv.org/abs/1901.02860 Section 3.3
         # (batch, head, time1, time2)
         matrix_ac = torch.matmul(q_with_bias_u, k.transpose(-2, -1))
 
-        # compute matrix b and matrix d
-        # (batch, head, time1, time1)
-        matrix_bd = torch.matmul(q_with_bias_v, p.transpose(-2, -1))
-        matrix_bd = self.rel_shift(matrix_bd)
-
         scores = (matrix_ac + matrix_bd) / math.sqrt(
             self.d_k
         )  # (batch, head, time1, time2)
@@ -287,17 +336,23 @@ class RelPositionMultiHeadedAttention(MultiHeadedAttention):
         # (batch, head, time1, d_k)
         q_with_bias_v = (q + self.pos_bias_v).transpose(1, 2)
 
+        # compute matrix b and matrix d
+        # (batch, head, time1, 2*time1-1)
+        matrix_bd = torch.matmul(q_with_bias_v, p.transpose(-2, -1))
+        matrix_bd = self.rel_shift(matrix_bd)
+
+        if self.use_sdpa:
+            # matrix a and matrix c are computed inside the fused kernel
+            return self.forward_attention_sdpa(
+                q_with_bias_u, k, v, mask, bias=matrix_bd / math.sqrt(self.d_k)
+            )
+
         # compute attention score
         # first compute matrix a and matrix c
         # as described in https://arxiv.org/abs/1901.02860 Section 3.3
         # (batch, head, time1, time2)
         matrix_ac = torch.matmul(q_with_bias_u, k.transpose(-2, -1))
 
-        # compute matrix b and matrix d
-        # (batch, head, time1, 2*time1-1)
-        matrix_bd = torch.matmul(q_with_bias_v, p.transpose(-2, -1))
-        matrix_bd = self.rel_shift(matrix_bd)
-
         scores = (matrix_ac + matrix_bd) / math.sqrt(
             self.d_k
         )  # (batch, head, time1, time2)
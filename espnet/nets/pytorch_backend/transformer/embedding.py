@@ -62,21 +62,24 @@ class PositionalEncoding(torch.nn.Module):
                 if self.pe.dtype != x.dtype or self.pe.device != x.device:
                     self.pe = self.pe.to(dtype=x.dtype, device=x.device)
                 return
-        pe = torch.zeros(x.size(1), self.d_model)
+        # build the table directly on the target device to avoid host-device copy
+        pe = torch.zeros(x.size(1), self.d_model, device=x.device)
         if self.reverse:
             position = torch.arange(
-                x.size(1) - 1, -1, -1.0, dtype=torch.float32
+                x.size(1) - 1, -1, -1.0, dtype=torch.float32, device=x.device
             ).unsqueeze(1)
         else:
-            position = torch.arange(0, x.size(1), dtype=torch.float32).unsqueeze(1)
+            position = torch.arange(
+                0, x.size(1), dtype=torch.float32, device=x.device
+            ).unsqueeze(1)
         div_term = torch.exp(
-            torch.arange(0, self.d_model, 2, dtype=torch.float32)
+            torch.arange(0, self.d_model, 2, dtype=torch.float32, device=x.device)
             * -(math.log(10000.0) / self.d_model)
         )
         pe[:, 0::2] = torch.sin(position * div_term)
         pe[:, 1::2] = torch.cos(position * div_term)
         pe = pe.unsqueeze(0)
-        self.pe = pe.to(device=x.device, dtype=x.dtype)
+        self.pe = pe.to(dtype=x.dtype)
 
     def forward(self, x: torch.Tensor):
         """Add positional encoding.
@@ -191,7 +194,8 @@ class LearnableFourierPosEnc(torch.nn.Module):
 
     def extend_pe(self, x):
         """Reset the positional encodings."""
-        position_v = torch.arange(0, x.size(1), dtype=torch.float32).unsqueeze(1).to(x)
+        position_v = torch.arange(0, x.size(1), dtype=torch.float32, device=x.device)
+        position_v = position_v.unsqueeze(1).to(dtype=x.dtype)
 
         cosine = torch.cos(torch.matmul(position_v, self.w_r))
         sine = torch.sin(torch.matmul(position_v, self.w_r))
@@ -292,11 +296,14 @@ class RelPositionalEncoding(torch.nn.Module):
         # Suppose `i` means to the position of query vecotr and `j` means the
         # position of key vector. We use position relative positions when keys
         # are to the left (i>j) and negative relative positions otherwise (i<j).
-        pe_positive = torch.zeros(x.size(1), self.d_model)
-        pe_negative = torch.zeros(x.size(1), self.d_model)
-        position = torch.arange(0, x.size(1), dtype=torch.float32).unsqueeze(1)
+        # build the table directly on the target device to avoid host-device copy
+        pe_positive = torch.zeros(x.size(1), self.d_model, device=x.device)
+        pe_negative = torch.zeros(x.size(1), self.d_model, device=x.device)
+        position = torch.arange(
+            0, x.size(1), dtype=torch.float32, device=x.device
+        ).unsqueeze(1)
         div_term = torch.exp(
-            torch.arange(0, self.d_model, 2, dtype=torch.float32)
+            torch.arange(0, self.d_model, 2, dtype=torch.float32, device=x.device)
             * -(math.log(10000.0) / self.d_model)
         )
         pe_positive[:, 0::2] = torch.sin(position * div_term)
@@ -310,7 +317,7 @@ class RelPositionalEncoding(torch.nn.Module):
         pe_positive = torch.flip(pe_positive, [0]).unsqueeze(0)
         pe_negative = pe_negative[1:].unsqueeze(0)
         pe = torch.cat([pe_positive, pe_negative], dim=1)
-        self.pe = pe.to(device=x.device, dtype=x.dtype)
+        self.pe = pe.to(dtype=x.dtype)
 
     def forward(self, x: torch.Tensor):
         """Add positional encoding.
@@ -359,16 +366,18 @@ class StreamPositionalEncoding(torch.nn.Module):
                 if self.pe.dtype != dtype or self.pe.device != device:
                     self.pe = self.pe.to(dtype=dtype, device=device)
                 return
-        pe = torch.zeros(length, self.d_model)
-        position = torch.arange(0, length, dtype=torch.float32).unsqueeze(1)
+        # build the table directly on the target device to avoid host-device copy
+        pe = torch.zeros(length, self.d_model, device=device)
+        position = torch.arange(0, length, dtype=torch.float32, device=device)
+        position = position.unsqueeze(1)
         div_term = torch.exp(
-            torch.arange(0, self.d_model, 2, dtype=torch.float32)
+            torch.arange(0, self.d_model, 2, dtype=torch.float32, device=device)
             * -(math.log(10000.0) / self.d_model)
         )
         pe[:, 0::2] = torch.sin(position * div_term)
         pe[:, 1::2] = torch.cos(position * div_term)
         pe = pe.unsqueeze(0)
-        self.pe = pe.to(device=device, dtype=dtype)
+        self.pe = pe.to(dtype=dtype)
 
     def forward(self, x: torch.Tensor, start_idx: int = 0):
         """Add positional encoding.
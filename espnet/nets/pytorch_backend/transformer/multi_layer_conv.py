@@ -7,6 +7,7 @@
 """Layer modules for FFT block in FastSpeech (Feed-forward Transformer)."""
 
 import torch
+import torch.nn.functional as F
 
 
 class MultiLayeredConv1d(torch.nn.Module):
@@ -59,6 +60,12 @@ class MultiLayeredConv1d(torch.nn.Module):
             torch.Tensor: Batch of output tensors (B, T, hidden_chans).
 
         """
+        if self.w_1.kernel_size[0] == 1:
+            # NOTE: conv1d with kernel_size=1 is a linear layer over the channels,
+            #   which can be applied without transposing the inputs
+            x = torch.relu(F.linear(x, self.w_1.weight.squeeze(-1), self.w_1.bias))
+            return F.linear(self.dropout(x), self.w_2.weight.squeeze(-1), self.w_2.bias)
+
         x = torch.relu(self.w_1(x.transpose(-1, 1))).transpose(-1, 1)
         return self.w_2(self.dropout(x).transpose(-1, 1)).transpose(-1, 1)
 
@@ -101,5 +108,9 @@ class Conv1dLinear(torch.nn.Module):
             torch.Tensor: Batch of output tensors (B, T, hidden_chans).
 
         """
-        x = torch.relu(self.w_1(x.transpose(-1, 1))).transpose(-1, 1)
+        if self.w_1.kernel_size[0] == 1:
+            # NOTE: see MultiLayeredConv1d.forward
+            x = torch.relu(F.linear(x, self.w_1.weight.squeeze(-1), self.w_1.bias))
+        else:
+            x = torch.relu(self.w_1(x.transpose(-1, 1))).transpose(-1, 1)
         return self.w_2(self.dropout(x))
@@ -8,9 +8,10 @@ This code is based on https://github.com/jaywalnut310/vits.
 
 """
 
+import operator
+from functools import reduce
 from typing import Dict, List, Optional, Tuple
 
-import numpy as np
 import torch
 import torch.nn.functional as F
 
@@ -22,12 +23,34 @@ from espnet2.gan_svs.vits.phoneme_predictor import PhonemePredictor
 from espnet2.gan_svs.vits.pitch_predictor import PitchPredictor
 from espnet2.gan_svs.vits.text_encoder import TextEncoder
 from espnet2.gan_tts.hifigan import HiFiGANGenerator
-from espnet2.gan_tts.utils import get_random_segments
+from espnet2.gan_tts.utils import (
+    CUDAGraphRunner,
+    get_autocast_context,
+    get_random_segments,
+)
+from espnet2.gan_tts.vits.generator import is_torch_2_2_plus
 from espnet2.gan_tts.vits.posterior_encoder import PosteriorEncoder
 from espnet2.gan_tts.vits.residual_coupling import ResidualAffineCouplingBlock
 from espnet.nets.pytorch_backend.transformer.embedding import PositionalEncoding
 
 
+def _narrow_or_pad(xs: List[torch.Tensor], length: int) -> List[torch.Tensor]:
+    """Truncate or zero-pad sequences to the given length.
+
+    Args:
+        xs (List[Tensor]): List of sequences with the same shape (B, T).
+        length (int): Target length.
+
+    Returns:
+        List[Tensor]: List of aligned sequences (B, length).
+
+    """
+    if xs[0].size(1) >= length:
+        return [x[:, :length] for x in xs]
+    # sequences share the same shape, so pad them at once
+    return list(F.pad(torch.stack(xs), (0, length - xs[0].size(1))).unbind(0))
+
+
 class VITSGenerator(torch.nn.Module):
     """Generator module in VITS.
 
@@ -71,6 +94,7 @@ class VITSGenerator(torch.nn.Module):
         text_encoder_conformer_kernel_size: int = 7,
         use_macaron_style_in_text_encoder: bool = True,
         use_conformer_conv_in_text_encoder: bool = True,
+        use_sdpa_in_text_encoder: bool = False,
         decoder_kernel_size: int = 7,
         decoder_channels: int = 512,
         decoder_upsample_scales: List[int] = [8, 8, 2, 2],
@@ -93,6 +117,8 @@ class VITSGenerator(torch.nn.Module):
         use_only_mean_in_flow: bool = True,
         use_dp: bool = True,
         use_visinger: bool = True,
+        use_torch_compile: bool = False,
+        use_space_to_batch: bool = False,
     ):
         """Initialize VITS generator module.
 
@@ -138,6 +164,8 @@ class VITSGenerator(torch.nn.Module):
                 in conformer block of text encoder.
             use_conformer_conv_in_text_encoder (bool): Whether to use covolution in
                 conformer block of text encoder.
+            use_sdpa_in_text_encoder (bool): Whether to use fused scaled dot product
+                attention in conformer block of text encoder (requires torch>=2.0.0).
             decoder_kernel_size (int): Decoder kernel size.
             decoder_channels (int): Number of decoder initial channels.
             decoder_upsample_scales (List[int]): List of upsampling scales in decoder.
@@ -164,6 +192,11 @@ class VITSGenerator(torch.nn.Module):
             use_weight_norm_in_flow (bool): Whether to apply weight normalization in
                 flow.
             use_only_mean_in_flow (bool): Whether to use only mean in flow.
+            use_torch_compile (bool): Whether to compile text encoder, decoder,
+                posterior encoder, and flow with torch.compile (requires
+                torch>=2.2.0).
+            use_space_to_batch (bool): Whether to compute the dilated convolutions in
+                posterior encoder and flow with space-to-batch transform.
         """
         super().__init__()
         self.segment_size = segment_size
@@ -188,6 +221,7 @@ class VITSGenerator(torch.nn.Module):
             midi_dim=midi_dim,
             beat_dim=beat_dim,
             use_visinger=use_visinger,
+            use_sdpa=use_sdpa_in_text_encoder,
         )
 
         self.decoder = HiFiGANGenerator(
@@ -213,6 +247,7 @@ class VITSGenerator(torch.nn.Module):
             global_channels=global_channels,
             dropout_rate=posterior_encoder_dropout_rate,
             use_weight_norm=use_weight_norm_in_posterior_encoder,
+            use_space_to_batch=use_space_to_batch,
         )
         self.flow = ResidualAffineCouplingBlock(
             in_channels=hidden_channels,
@@ -225,6 +260,7 @@ class VITSGenerator(torch.nn.Module):
             dropout_rate=flow_dropout_rate,
             use_weight_norm=use_weight_norm_in_flow,
             use_only_mean=use_only_mean_in_flow,
+            use_space_to_batch=use_space_to_batch,
         )
         self.use_visinger = use_visinger
         self.use_dp = use_dp
@@ -242,7 +278,10 @@ class VITSGenerator(torch.nn.Module):
                 global_channels=global_channels,
             )
 
-        self.lr = LengthRegulator()
+        self.lr = torch.jit.script(LengthRegulator())
+
+        # positional encoding table is cached and extended on demand
+        self.pos_encoder = PositionalEncoding(d_model=hidden_channels, dropout_rate=0)
 
         self.pitch_predictor = PitchPredictor(
             hidden_channels=hidden_channels,
@@ -262,7 +301,7 @@ class VITSGenerator(torch.nn.Module):
             blocks=2,
         )
 
-        self.upsample_factor = int(np.prod(decoder_upsample_scales))
+        self.upsample_factor = reduce(operator.mul, decoder_upsample_scales, 1)
         self.spks = None
         if spks is not None and spks > 1:
             assert global_channels > 0
@@ -279,6 +318,21 @@ class VITSGenerator(torch.nn.Module):
             self.langs = langs
             self.lang_emb = torch.nn.Embedding(langs, global_channels)
 
+        # lazily created in inference with use_cuda_graph = True
+        self._cuda_graph_decode = None
+
+        if use_torch_compile:
+            assert is_torch_2_2_plus, "use_torch_compile requires torch>=2.2.0."
+            # NOTE: Module.compile() keeps the parameter names unchanged so that
+            #   the checkpoints are compatible with the non-compiled model.
+            #   Static shapes are not forced even for the decoder, which takes
+            #   fixed-length segments in training, since it is also called with
+            #   variable lengths in inference.
+            self.decoder.compile()
+            self.text_encoder.compile()
+            self.posterior_encoder.compile()
+            self.flow.compile()
+
     def forward(
         self,
         text: torch.Tensor,
@@ -350,54 +404,15 @@ class VITSGenerator(torch.nn.Module):
 
         """
         # calculate global conditioning
-        g = None
-        if self.spks is not None:
-            # speaker one-hot vector embedding: (B, global_channels, 1)
-            g = self.global_emb(sids.view(-1)).unsqueeze(-1)
-        if self.spk_embed_dim is not None:
-            # pretreined speaker embedding, e.g., X-vector (B, global_channels, 1)
-            g_ = self.spemb_proj(F.normalize(spembs)).unsqueeze(-1)
-            if g is None:
-                g = g_
-            else:
-                g = g + g_
-        if self.langs is not None:
-            # language one-hot vector embedding: (B, global_channels, 1)
-            g_ = self.lang_emb(lids.view(-1)).unsqueeze(-1)
-            if g is None:
-                g = g_
-            else:
-                g = g + g_
+        g = self._calculate_global_conditioning(sids, spembs, lids)
 
         # forward text encoder
         if not self.use_dp:
             # align frame length
-            for i, length in enumerate(label_lengths):
-                if length == label.shape[1]:
-                    label_lengths[i] = feats.shape[2]
-            if label.shape[1] < feats.shape[2]:
-                label = F.pad(
-                    input=label,
-                    pad=(0, feats.shape[2] - label.shape[1], 0, 0),
-                    mode="constant",
-                    value=0,
-                )
-                melody = F.pad(
-                    input=melody,
-                    pad=(0, feats.shape[2] - melody.shape[1], 0, 0),
-                    mode="constant",
-                    value=0,
-                )
-                beat = F.pad(
-                    input=beat,
-                    pad=(0, feats.shape[2] - beat.shape[1], 0, 0),
-                    mode="constant",
-                    value=0,
-                )
-            else:
-                label = label[:, : feats.shape[2]]
-                melody = melody[:, : feats.shape[2]]
-                beat = beat[:, : feats.shape[2]]
+            label_lengths = label_lengths.masked_fill(
+                label_lengths == label.shape[1], feats.shape[2]
+            )
+            label, melody, beat = _narrow_or_pad([label, melody, beat], feats.shape[2])
 
             x, m_p, logs_p, x_mask = self.text_encoder(
                 label, label_lengths, melody, beat
@@ -416,9 +431,6 @@ class VITSGenerator(torch.nn.Module):
 
             x_mask = torch.unsqueeze(sequence_mask(x_lengths, x.size(2)), 1)
 
-        self.pos_encoder = PositionalEncoding(
-            d_model=x.size(1), dropout_rate=0, max_len=x.size(2)
-        )
         x = self.pos_encoder(x.transpose(1, 2)).transpose(1, 2)
 
         if self.use_visinger:
@@ -514,6 +526,8 @@ class VITSGenerator(torch.nn.Module):
         alpha: float = 1.0,
         max_len: Optional[int] = None,
         use_teacher_forcing: bool = False,
+        inference_dtype: Optional[torch.dtype] = None,
+        use_cuda_graph: bool = False,
     ) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
         """Run inference.
 
@@ -537,72 +551,137 @@ class VITSGenerator(torch.nn.Module):
             alpha (float): Alpha parameter to control the speed of generated speech.
             max_len (Optional[int]): Maximum length of acoustic feature sequence.
             use_teacher_forcing (bool): Whether to use teacher forcing.
+            inference_dtype (Optional[torch.dtype]): If specified (e.g.,
+                torch.bfloat16), run the network under autocast with this dtype.
+                Exponentials are still computed in float32.
+            use_cuda_graph (bool): Whether to run flow and decoder by replaying
+                CUDA graphs captured for each input shape. Only effective on GPU.
 
         Returns:
             Tensor: Generated waveform tensor (B, T_wav).
 
         """
-        # encoder
-        if self.use_dp:
-            x, m_p, logs_p, x_mask = self.text_encoder(
-                label, label_lengths, melody, beat
-            )
-        else:
-            x, m_p, logs_p, x_mask = self.text_encoder(
-                label, label_lengths, melody, beat
-            )
-        g = None
+        with get_autocast_context(label.device.type, inference_dtype):
+            # encoder
+            if self.use_dp:
+                x, m_p, logs_p, x_mask = self.text_encoder(
+                    label, label_lengths, melody, beat
+                )
+            else:
+                x, m_p, logs_p, x_mask = self.text_encoder(
+                    label, label_lengths, melody, beat
+                )
+            g = self._calculate_global_conditioning(sids, spembs, lids)
+
+            if use_teacher_forcing:
+                # forward posterior encoder
+                z, m_q, logs_q, y_mask = self.posterior_encoder(
+                    feats, feats_lengths, g=g
+                )
+
+                # forward decoder
+                wav = self.decoder(z * y_mask, g=g)
+            else:
+                if self.use_visinger:
+                    if self.use_dp:
+                        logw = self.duration_predictor(x, x_mask, beat, g=g)
+                        # NOTE: keep exp in float32 to avoid overflow in half precision
+                        logw = (torch.exp(logw.float()) - 1) * x_mask
+                        logw = torch.mul(logw.squeeze(1), beat).unsqueeze(1)
+                        logw[logw < 0] = 0
+                        logw = logw.squeeze(1).to(torch.long)
+
+                        x, frame_pitch, x_lengths = self.lr(
+                            x, melody, logw, label_lengths
+                        )
+                        x_mask = torch.unsqueeze(sequence_mask(x_lengths, x.size(2)), 1)
+
+                    x = self.pos_encoder(x.transpose(1, 2)).transpose(1, 2)
+
+                    _, pitch_embedding = self.pitch_predictor(x, x_mask)
+                    x = self.frame_prior_net(x, pitch_embedding, x_mask)
+                    m_p, logs_p = self.project(x, x_mask)
+
+        if not use_teacher_forcing:
+            # NOTE: decoder is run outside of the autocast context above, since
+            #   the cast parameters cached by the context must not be captured
+            #   into CUDA graphs. _decode opens its own context instead.
+            m_p, logs_p = m_p.float(), logs_p.float()
+            if use_cuda_graph and m_p.is_cuda:
+                if self._cuda_graph_decode is None:
+                    self._cuda_graph_decode = CUDAGraphRunner(self._decode)
+                wav = self._cuda_graph_decode(
+                    m_p, logs_p, x_mask, g, noise_scale, max_len, inference_dtype
+                )
+            else:
+                wav = self._decode(
+                    m_p, logs_p, x_mask, g, noise_scale, max_len, inference_dtype
+                )
+
+        return wav.squeeze(1).float()
+
+    def _calculate_global_conditioning(
+        self,
+        sids: Optional[torch.Tensor] = None,
+        spembs: Optional[torch.Tensor] = None,
+        lids: Optional[torch.Tensor] = None,
+    ) -> Optional[torch.Tensor]:
+        """Calculate global conditioning.
+
+        Args:
+            sids (Optional[Tensor]): Speaker index tensor (B,) or (B, 1).
+            spembs (Optional[Tensor]): Speaker embedding tensor (B, spk_embed_dim)
+                or (spk_embed_dim,).
+            lids (Optional[Tensor]): Language index tensor (B,) or (B, 1).
+
+        Returns:
+            Optional[Tensor]: Global conditioning tensor (B, global_channels, 1).
+
+        """
+        gs = []
         if self.spks is not None:
-            # (B, global_channels, 1)
-            g = self.global_emb(sids.view(-1)).unsqueeze(-1)
+            # speaker one-hot vector embedding: (B, global_channels)
+            gs.append(self.global_emb(sids.view(-1)))
         if self.spk_embed_dim is not None:
-            # (B, global_channels, 1)
-            g_ = self.spemb_proj(F.normalize(spembs.unsqueeze(0))).unsqueeze(-1)
-            if g is None:
-                g = g_
-            else:
-                g = g + g_
+            # pretreined speaker embedding, e.g., X-vector (B, global_channels)
+            spembs = spembs.view(-1, self.spk_embed_dim)
+            gs.append(self.spemb_proj(F.normalize(spembs)))
         if self.langs is not None:
-            # (B, global_channels, 1)
-            g_ = self.lang_emb(lids.view(-1)).unsqueeze(-1)
-            if g is None:
-                g = g_
-            else:
-                g = g + g_
+            # language one-hot vector embedding: (B, global_channels)
+            gs.append(self.lang_emb(lids.view(-1)))
+        if len(gs) == 0:
+            return None
 
-        if use_teacher_forcing:
-            # forward posterior encoder
-            z, m_q, logs_q, y_mask = self.posterior_encoder(feats, feats_lengths, g=g)
+        return reduce(operator.add, gs).unsqueeze(-1)
 
-            # forward flow
-            z_p = self.flow(z, y_mask, g=g)  # (B, H, T_feats)
+    def _decode(
+        self,
+        m_p: torch.Tensor,
+        logs_p: torch.Tensor,
+        x_mask: torch.Tensor,
+        g: Optional[torch.Tensor],
+        noise_scale: float,
+        max_len: Optional[int],
+        inference_dtype: Optional[torch.dtype] = None,
+    ) -> torch.Tensor:
+        """Sample latent from prior and decode it into waveform.
 
-            # forward decoder with random segments
-            wav = self.decoder(z * y_mask, g=g)
-        else:
-            if self.use_visinger:
-                if self.use_dp:
-                    logw = self.duration_predictor(x, x_mask, beat, g=g)
-                    logw = (torch.exp(logw) - 1) * x_mask
-                    logw = torch.mul(logw.squeeze(1), beat).unsqueeze(1)
-                    logw[logw < 0] = 0
-                    logw = logw.squeeze(1).to(torch.long)
-
-                    x, frame_pitch, x_lengths = self.lr(x, melody, logw, label_lengths)
-                    x_mask = torch.unsqueeze(sequence_mask(x_lengths, x.size(2)), 1)
-
-                self.pos_encoder = PositionalEncoding(
-                    d_model=x.size(1), dropout_rate=0, max_len=x.size(2)
-                )
-                x = self.pos_encoder(x.transpose(1, 2)).transpose(1, 2)
+        Args:
+            m_p (Tensor): Expanded prior mean tensor (B, H, T_feats).
+            logs_p (Tensor): Expanded prior scale tensor (B, H, T_feats).
+            x_mask (Tensor): Feature mask tensor (B, 1, T_feats).
+            g (Optional[Tensor]): Global conditioning tensor (B, global_channels, 1).
+            noise_scale (float): Noise scale parameter for flow.
+            max_len (Optional[int]): Maximum length of acoustic feature sequence.
+            inference_dtype (Optional[torch.dtype]): Autocast dtype of flow and
+                decoder. If None, run them in the default dtype. This is passed
+                explicitly so that CUDA graphs are captured for each dtype.
 
-                _, pitch_embedding = self.pitch_predictor(x, x_mask)
-                x = self.frame_prior_net(x, pitch_embedding, x_mask)
-                m_p, logs_p = self.project(x, x_mask)
+        Returns:
+            Tensor: Generated waveform tensor (B, 1, T_wav).
 
-            # decoder
-            z_p = m_p + torch.randn_like(m_p) * torch.exp(logs_p) * noise_scale
+        """
+        z_p = m_p + torch.randn_like(m_p) * torch.exp(logs_p) * noise_scale
+        with get_autocast_context(z_p.device.type, inference_dtype):
             z = self.flow(z_p, x_mask, g=g, inverse=True)
-            wav = self.decoder((z * x_mask)[:, :, :max_len], g=g)
-
-        return wav.squeeze(1)
+            return self.decoder((z * x_mask)[:, :, :max_len], g=g)
@@ -7,15 +7,19 @@
 
 """Length regulator related modules."""
 
-import logging
+import warnings
+from typing import Tuple
 
 import torch
 
-from espnet.nets.pytorch_backend.nets_utils import pad_list
-
 
 class LengthRegulator(torch.nn.Module):
-    """Length Regulator"""
+    """Length Regulator
+
+    The forward propagation is written in TorchScript compatible manner so that
+    the module can be compiled with ``torch.jit.script``.
+
+    """
 
     def __init__(self, pad_value=0.0):
         """Initilize length regulator module.
@@ -24,7 +28,7 @@ class LengthRegulator(torch.nn.Module):
             pad_value (float, optional): Value used for padding.
         """
         super().__init__()
-        self.pad_value = pad_value
+        self.pad_value = float(pad_value)
         self.winlen = 1024
         self.hoplen = 256
         self.sr = 24000
@@ -96,29 +100,49 @@ class LengthRegulator(torch.nn.Module):
         out = torch.cat(out, 0)
         return out
 
-    def forward(self, xs, notepitch, ds, x_lengths):
+    def forward(
+        self,
+        xs: torch.Tensor,
+        notepitch: torch.Tensor,
+        ds: torch.Tensor,
+        x_lengths: torch.Tensor,
+    ) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+        """Calculate forward propagation.
+
+        Args:
+            xs (Tensor): Batch of sequences of char or phoneme embeddings (B, D, T).
+            notepitch (Tensor): Batch of note pitch sequences (B, T).
+            ds (LongTensor): Batch of durations of each input (B, T).
+            x_lengths (Tensor): Batch of input lengths (B,).
+
+        Returns:
+            Tensor: Expanded sequences (B, D, T_frame).
+            Tensor: Expanded note pitch sequences (B, T_frame).
+            LongTensor: Batch of expanded lengths (B,).
+
+        """
         if ds.sum() == 0:
-            logging.warning(
+            warnings.warn(
                 "predicted durations includes all 0 sequences. "
                 "fill the first element with 1."
             )
             ds[ds.sum(dim=1).eq(0)] = 1
 
-        # expand xs
-        xs = torch.transpose(xs, 1, 2)
-        # print("ds", ds)
-        phn_repeat = [torch.repeat_interleave(x, d, dim=0) for x, d in zip(xs, ds)]
-        output = pad_list(phn_repeat, self.pad_value)  # (B, D_frame, dim)
-        output = torch.transpose(output, 1, 2)
-
-        # expand pitch
-        notepitch = torch.detach(notepitch)
-        pitch_repeat = [
-            torch.repeat_interleave(n, d, dim=0) for n, d in zip(notepitch, ds)
-        ]
-        frame_pitch = pad_list(pitch_repeat, self.pad_value)  # (B, D_frame)
-
-        x_lengths = torch.LongTensor([len(i) for i in pitch_repeat]).to(
-            frame_pitch.device
-        )
+        # index of the input for each frame: (B, D_frame)
+        cum_ds = torch.cumsum(ds, dim=1)
+        x_lengths = cum_ds[:, -1].long()
+        frames = torch.arange(int(x_lengths.max()), dtype=ds.dtype, device=ds.device)
+        frames = frames.unsqueeze(0).expand(ds.size(0), -1).contiguous()
+        idx = torch.searchsorted(cum_ds.contiguous(), frames, right=True)
+        idx = idx.clamp(max=ds.size(1) - 1)
+        pad_mask = frames >= x_lengths.unsqueeze(1)
+
+        # expand xs: (B, dim, D_frame)
+        output = torch.gather(xs, 2, idx.unsqueeze(1).expand(-1, xs.size(1), -1))
+        output = output.masked_fill(pad_mask.unsqueeze(1), self.pad_value)
+
+        # expand pitch: (B, D_frame)
+        frame_pitch = torch.gather(torch.detach(notepitch), 1, idx)
+        frame_pitch = frame_pitch.masked_fill(pad_mask, self.pad_value)
+
         return output, frame_pitch, x_lengths
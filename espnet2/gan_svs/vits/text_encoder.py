@@ -15,6 +15,12 @@ import torch
 
 from espnet.nets.pytorch_backend.conformer.encoder import Encoder
 from espnet.nets.pytorch_backend.nets_utils import make_non_pad_mask
+from espnet.nets.pytorch_backend.transformer.attention import (
+    LegacyRelPositionMultiHeadedAttention,
+    MultiHeadedAttention,
+    RelPositionMultiHeadedAttention,
+    is_sdpa_available,
+)
 
 
 class TextEncoder(torch.nn.Module):
@@ -53,6 +59,7 @@ class TextEncoder(torch.nn.Module):
         midi_dim: int = 129,
         beat_dim: int = 600,
         use_visinger: bool = True,
+        use_sdpa: bool = False,
     ):
         """Initialize TextEncoder module.
 
@@ -74,6 +81,8 @@ class TextEncoder(torch.nn.Module):
             dropout_rate (float): Dropout rate.
             positional_dropout_rate (float): Dropout rate for positional encoding.
             attention_dropout_rate (float): Dropout rate for attention.
+            use_sdpa (bool): Whether to use fused scaled dot product attention
+                (requires torch>=2.0.0) in self-attention layers.
 
         """
         super().__init__()
@@ -103,6 +112,15 @@ class TextEncoder(torch.nn.Module):
             use_cnn_module=use_conformer_conv,
             cnn_module_kernel=conformer_kernel_size,
         )
+        if use_sdpa:
+            assert is_sdpa_available, "use_sdpa requires torch>=2.0.0."
+            for module in self.encoder.modules():
+                if type(module) in (
+                    MultiHeadedAttention,
+                    LegacyRelPositionMultiHeadedAttention,
+                    RelPositionMultiHeadedAttention,
+                ):
+                    module.use_sdpa = True
         self.proj = torch.nn.Conv1d(attention_dim, attention_dim * 2, 1)
         self.pitch_embedding = torch.nn.Embedding(midi_dim, attention_dim)
         self.beat_embedding = torch.nn.Embedding(beat_dim, attention_dim)
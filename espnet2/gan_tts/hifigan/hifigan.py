@@ -134,13 +134,19 @@ class HiFiGANGenerator(torch.nn.Module):
         self.reset_parameters()
 
     def forward(
-        self, c: torch.Tensor, g: Optional[torch.Tensor] = None
+        self,
+        c: torch.Tensor,
+        g: Optional[torch.Tensor] = None,
+        out: Optional[torch.Tensor] = None,
     ) -> torch.Tensor:
         """Calculate forward propagation.
 
         Args:
             c (Tensor): Input tensor (B, in_channels, T).
             g (Optional[Tensor]): Global conditioning tensor (B, global_channels, 1).
+            out (Optional[Tensor]): Buffer to write the output tensor into
+                (B, out_channels, T * prod(upsample_scales)). Gradient can not be
+                propagated through the buffer.
 
         Returns:
             Tensor: Output tensor (B, out_channels, T).
@@ -155,7 +161,11 @@ class HiFiGANGenerator(torch.nn.Module):
             for j in range(self.num_blocks):
                 cs += self.blocks[i * self.num_blocks + j](c)
             c = cs / self.num_blocks
-        c = self.output_conv(c)
+        if out is None:
+            c = self.output_conv(c)
+        else:
+            # write the final tanh activation into the given buffer
+            c = torch.tanh(self.output_conv[:-1](c), out=out)
 
         return c
 
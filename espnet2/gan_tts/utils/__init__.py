@@ -1,2 +1,4 @@
 from espnet2.gan_tts.utils.get_random_segments import get_random_segments  # NOQA
 from espnet2.gan_tts.utils.get_random_segments import get_segments  # NOQA
+from espnet2.gan_tts.utils.cuda_graph import CUDAGraphRunner  # NOQA
+from espnet2.gan_tts.utils.autocast import get_autocast_context  # NOQA
@@ -0,0 +1,32 @@
+#  Apache 2.0  (http://www.apache.org/licenses/LICENSE-2.0)
+
+"""Function to get autocast context for inference."""
+
+import contextlib
+from typing import ContextManager, Optional
+
+import torch
+from packaging.version import parse as V
+
+is_torch_1_10_plus = V(torch.__version__) >= V("1.10.0")
+
+
+def get_autocast_context(
+    device_type: str, dtype: Optional[torch.dtype]
+) -> ContextManager:
+    """Get autocast context.
+
+    Args:
+        device_type (str): Device type, e.g., "cuda" or "cpu".
+        dtype (Optional[torch.dtype]): Autocast dtype. If None, a null context is
+            returned so that torch.autocast is never entered, which does not exist
+            in torch<1.10.0.
+
+    Returns:
+        ContextManager: Autocast context.
+
+    """
+    if dtype is None:
+        return contextlib.nullcontext()
+    assert is_torch_1_10_plus, "inference_dtype requires torch>=1.10.0."
+    return torch.autocast(device_type=device_type, dtype=dtype)
@@ -0,0 +1,101 @@
+#  Apache 2.0  (http://www.apache.org/licenses/LICENSE-2.0)
+
+"""CUDA graph runner for fixed-shape inference."""
+
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import torch
+
+
+class CUDAGraphRunner:
+    """Run a function by replaying captured CUDA graphs.
+
+    A graph is captured for each combination of input tensor shapes and
+    non-tensor arguments, and replayed on the subsequent calls with the same
+    combination. This removes the kernel launch overhead, which dominates the
+    inference time of small models and short inputs. Since the inputs are copied
+    into static buffers before the replay, the function must only depend on its
+    arguments and must not perform host-device synchronization.
+
+    All the graphs share a single memory pool, which is safe because the graphs
+    are replayed one at a time and the output is copied out of the pool after
+    each replay. At most ``max_graphs`` graphs are kept, and the least recently
+    used one is released when a new shape comes in.
+
+    Args:
+        func (Callable): Function to be captured, which takes tensors, None, or
+            hashable values as positional arguments and returns a tensor.
+        num_warmup (int): Number of warmup runs before the capture.
+        max_graphs (int): Maximum number of graphs to be kept.
+
+    """
+
+    def __init__(
+        self,
+        func: Callable[..., torch.Tensor],
+        num_warmup: int = 3,
+        max_graphs: int = 16,
+    ):
+        """Initialize CUDAGraphRunner."""
+        assert max_graphs > 0, "max_graphs must be positive."
+        self.func = func
+        self.num_warmup = num_warmup
+        self.max_graphs = max_graphs
+        self.pool = None
+        # NOTE: ordered from the least recently used one
+        self.graphs: Dict[
+            Tuple[Any, ...],
+            Tuple[torch.cuda.CUDAGraph, Tuple[Any, ...], torch.Tensor],
+        ] = OrderedDict()
+
+    def __call__(self, *args: Optional[Any]) -> torch.Tensor:
+        """Run the function with a captured CUDA graph.
+
+        Args:
+            *args: Positional arguments of the function.
+
+        Returns:
+            Tensor: Output tensor of the function.
+
+        """
+        key = tuple(
+            (arg.shape, arg.dtype, arg.device) if isinstance(arg, torch.Tensor) else arg
+            for arg in args
+        )
+        if key in self.graphs:
+            self.graphs.move_to_end(key)
+        else:
+            if len(self.graphs) >= self.max_graphs:
+                self.graphs.popitem(last=False)
+            self.graphs[key] = self._capture(args)
+        graph, static_args, static_output = self.graphs[key]
+        for static_arg, arg in zip(static_args, args):
+            if isinstance(arg, torch.Tensor):
+                static_arg.copy_(arg)
+        graph.replay()
+
+        return static_output.clone()
+
+    def _capture(
+        self, args: Tuple[Any, ...]
+    ) -> Tuple[torch.cuda.CUDAGraph, Tuple[Any, ...], torch.Tensor]:
+        static_args = tuple(
+            arg.clone() if isinstance(arg, torch.Tensor) else arg for arg in args
+        )
+
+        # warmup on a side stream as required by the capture
+        stream = torch.cuda.Stream()
+        stream.wait_stream(torch.cuda.current_stream())
+        with torch.cuda.stream(stream):
+            for _ in range(self.num_warmup):
+                self.func(*static_args)
+        torch.cuda.current_stream().wait_stream(stream)
+
+        if self.pool is None:
+            self.pool = torch.cuda.graph_pool_handle()
+        graph = torch.cuda.CUDAGraph()
+        with torch.cuda.graph(graph, pool=self.pool):
+            static_output = self.func(*static_args)
+
+        return graph, static_args, static_output
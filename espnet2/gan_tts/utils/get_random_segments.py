@@ -27,7 +27,7 @@ def get_random_segments(
     """
     b, c, t = x.size()
     max_start_idx = x_lengths - segment_size
-    start_idxs = (torch.rand([b]).to(x.device) * max_start_idx).to(
+    start_idxs = (torch.rand([b], device=x.device) * max_start_idx).to(
         dtype=torch.long,
     )
     segments = get_segments(x, start_idxs, segment_size)
@@ -51,7 +51,6 @@ def get_segments(
 
     """
     b, c, t = x.size()
-    segments = x.new_zeros(b, c, segment_size)
-    for i, start_idx in enumerate(start_idxs):
-        segments[i] = x[i, :, start_idx : start_idx + segment_size]
-    return segments
+    # gather all of the segments at once instead of slicing each sample
+    idxs = start_idxs.unsqueeze(1) + torch.arange(segment_size, device=x.device)
+    return torch.gather(x, 2, idxs.unsqueeze(1).expand(-1, c, -1))
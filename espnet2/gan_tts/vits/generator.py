@@ -8,19 +8,83 @@ This code is based on https://github.com/jaywalnut310/vits.
 """
 
 import math
+import warnings
 from typing import List, Optional, Tuple
 
 import numpy as np
 import torch
 import torch.nn.functional as F
+from packaging.version import parse as V
 
 from espnet2.gan_tts.hifigan import HiFiGANGenerator
-from espnet2.gan_tts.utils import get_random_segments
+from espnet2.gan_tts.utils import (
+    CUDAGraphRunner,
+    get_autocast_context,
+    get_random_segments,
+)
 from espnet2.gan_tts.vits.duration_predictor import StochasticDurationPredictor
 from espnet2.gan_tts.vits.posterior_encoder import PosteriorEncoder
 from espnet2.gan_tts.vits.residual_coupling import ResidualAffineCouplingBlock
 from espnet2.gan_tts.vits.text_encoder import TextEncoder
-from espnet.nets.pytorch_backend.nets_utils import make_non_pad_mask
+from espnet.nets.pytorch_backend.nets_utils import make_non_pad_mask, pad_list
+
+_LOG_2PI = math.log(2 * math.pi)
+
+is_torch_2_2_plus = V(torch.__version__) >= V("2.2.0")
+
+
+@torch.jit.script
+def _generate_path_index(dur: torch.Tensor, frames: torch.Tensor) -> torch.Tensor:
+    """Generate the index of the aligned text for each frame.
+
+    See :meth:`VITSGenerator._generate_path_index`.
+
+    """
+    # NOTE: durations are integers, so int32 is enough for the search
+    dur = dur.squeeze(1).to(torch.int32)
+    cum_dur = torch.cumsum(dur, -1, dtype=torch.int32)  # (B, T_text)
+    frames = frames.unsqueeze(0).expand(cum_dur.size(0), -1).contiguous()
+    # number of texts finished before each frame: (B, T_feats)
+    return torch.searchsorted(cum_dur, frames, right=True)
+
+
+@torch.jit.script
+def _generate_path(idx: torch.Tensor, mask: torch.Tensor) -> torch.Tensor:
+    """Generate path a.k.a. monotonic attention from the index.
+
+    See :meth:`VITSGenerator._generate_path`.
+
+    """
+    t_x = mask.size(-1)
+    # scatter ones directly in the mask dtype instead of casting int64 one-hot
+    # NOTE: frames exceeding the total duration fall into the extra class
+    #   T_text, which is dropped
+    path = mask.new_zeros([mask.size(0), mask.size(2), t_x + 1])
+    path.scatter_(2, idx.unsqueeze(-1), 1.0)
+    return path[:, :, :t_x].unsqueeze(1) * mask
+
+
+def _sample_from_prior(
+    m_p: torch.Tensor, logs_p: torch.Tensor, noise_scale: float
+) -> torch.Tensor:
+    """Sample latent variables from the prior distribution.
+
+    Args:
+        m_p (Tensor): Mean tensor (B, H, T_feats).
+        logs_p (Tensor): Log-scale tensor (B, H, T_feats).
+        noise_scale (float): Noise scale parameter.
+
+    Returns:
+        Tensor: Sampled tensor (B, H, T_feats).
+
+    """
+    if noise_scale == 0.0:
+        return m_p
+    noise = torch.empty_like(m_p).normal_()
+    if noise_scale < 0.0:
+        return m_p + noise * torch.exp(logs_p) * noise_scale
+    # fold the noise scale into the exponent and fuse the scaled addition
+    return torch.addcmul(m_p, noise, torch.exp(logs_p + math.log(noise_scale)))
 
 
 class VITSGenerator(torch.nn.Module):
@@ -86,6 +150,8 @@ class VITSGenerator(torch.nn.Module):
         stochastic_duration_predictor_dropout_rate: float = 0.5,
         stochastic_duration_predictor_flows: int = 4,
         stochastic_duration_predictor_dds_conv_layers: int = 3,
+        use_torch_compile_in_sampling: bool = False,
+        mas_type: str = "cpu",
     ):
         """Initialize VITS generator module.
 
@@ -165,6 +231,12 @@ class VITSGenerator(torch.nn.Module):
                 duration predictor.
             stochastic_duration_predictor_dds_conv_layers (int): Number of DDS conv
                 layers in stochastic duration predictor.
+            use_torch_compile_in_sampling (bool): Whether to fuse the sampling from
+                the prior in inference with torch.compile (requires torch>=2.2.0).
+            mas_type (str): Implementation of monotonic alignment search. "cpu" uses
+                cython (or numba) version on CPU, "torch" uses vectorized version on
+                the input device, and "triton" uses Triton kernel of
+                super-monotonic-align (requires CUDA).
 
         """
         super().__init__()
@@ -252,9 +324,43 @@ class VITSGenerator(torch.nn.Module):
             self.lang_emb = torch.nn.Embedding(langs, global_channels)
 
         # delayed import
-        from espnet2.gan_tts.vits.monotonic_align import maximum_path
+        from espnet2.gan_tts.vits.monotonic_align import (
+            is_super_monotonic_align_available,
+            maximum_path,
+            maximum_path_torch,
+            maximum_path_triton,
+        )
+
+        if mas_type == "triton" and not is_super_monotonic_align_available:
+            warnings.warn(
+                "super-monotonic-align is not available. Fallback to 'torch' "
+                "version. If you want to use the triton version, please install "
+                "it via `pip install super-monotonic-align`."
+            )
+            mas_type = "torch"
+        if mas_type == "cpu":
+            self.maximum_path = maximum_path
+        elif mas_type == "torch":
+            self.maximum_path = maximum_path_torch
+        elif mas_type == "triton":
+            self.maximum_path = maximum_path_triton
+        else:
+            raise ValueError(f"Not supported mas_type: {mas_type}")
+
+        # lazily created in inference with use_cuda_graph = True
+        self._cuda_graph_decode = None
+
+        # frame indices reused in inference, grown on demand
+        self._frames = None
 
-        self.maximum_path = maximum_path
+        if use_torch_compile_in_sampling:
+            assert (
+                is_torch_2_2_plus
+            ), "use_torch_compile_in_sampling requires torch>=2.2.0."
+            # NOTE: the pointwise ops are fused into a single kernel
+            self._sample_from_prior = torch.compile(_sample_from_prior, dynamic=True)
+        else:
+            self._sample_from_prior = _sample_from_prior
 
     def forward(
         self,
@@ -339,32 +445,8 @@ class VITSGenerator(torch.nn.Module):
 
         # monotonic alignment search
         with torch.no_grad():
-            # negative cross-entropy
-            s_p_sq_r = torch.exp(-2 * logs_p)  # (B, H, T_text)
-            # (B, 1, T_text)
-            neg_x_ent_1 = torch.sum(
-                -0.5 * math.log(2 * math.pi) - logs_p,
-                [1],
-                keepdim=True,
-            )
-            # (B, T_feats, H) x (B, H, T_text) = (B, T_feats, T_text)
-            neg_x_ent_2 = torch.matmul(
-                -0.5 * (z_p**2).transpose(1, 2),
-                s_p_sq_r,
-            )
-            # (B, T_feats, H) x (B, H, T_text) = (B, T_feats, T_text)
-            neg_x_ent_3 = torch.matmul(
-                z_p.transpose(1, 2),
-                (m_p * s_p_sq_r),
-            )
-            # (B, 1, T_text)
-            neg_x_ent_4 = torch.sum(
-                -0.5 * (m_p**2) * s_p_sq_r,
-                [1],
-                keepdim=True,
-            )
-            # (B, T_feats, T_text)
-            neg_x_ent = neg_x_ent_1 + neg_x_ent_2 + neg_x_ent_3 + neg_x_ent_4
+            # negative cross-entropy: (B, T_feats, T_text)
+            neg_x_ent = self._calculate_neg_x_ent(z_p, m_p, logs_p)
             # (B, 1, T_feats, T_text)
             attn_mask = torch.unsqueeze(x_mask, 2) * torch.unsqueeze(y_mask, -1)
             # monotonic attention weight: (B, 1, T_feats, T_text)
@@ -383,10 +465,10 @@ class VITSGenerator(torch.nn.Module):
         dur_nll = dur_nll / torch.sum(x_mask)
 
         # expand the length to match with the feature sequence
-        # (B, T_feats, T_text) x (B, T_text, H) -> (B, H, T_feats)
-        m_p = torch.matmul(attn.squeeze(1), m_p.transpose(1, 2)).transpose(1, 2)
-        # (B, T_feats, T_text) x (B, T_text, H) -> (B, H, T_feats)
-        logs_p = torch.matmul(attn.squeeze(1), logs_p.transpose(1, 2)).transpose(1, 2)
+        # (B, H, T_text) x (B, T_text, T_feats) -> (B, H, T_feats)
+        attn_t = attn.squeeze(1).transpose(1, 2)
+        m_p = torch.bmm(m_p, attn_t)
+        logs_p = torch.bmm(logs_p, attn_t)
 
         # get random segments
         z_segments, z_start_idxs = get_random_segments(
@@ -408,6 +490,7 @@ class VITSGenerator(torch.nn.Module):
             (z, z_p, m_p, logs_p, m_q, logs_q),
         )
 
+    @torch.no_grad()
     def inference(
         self,
         text: torch.Tensor,
@@ -423,7 +506,11 @@ class VITSGenerator(torch.nn.Module):
         alpha: float = 1.0,
         max_len: Optional[int] = None,
         use_teacher_forcing: bool = False,
-    ) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+        inference_dtype: Optional[torch.dtype] = None,
+        use_cuda_graph: bool = False,
+        return_alignment: bool = True,
+        out: Optional[torch.Tensor] = None,
+    ) -> Tuple[torch.Tensor, Optional[torch.Tensor], torch.Tensor]:
         """Run inference.
 
         Args:
@@ -441,10 +528,22 @@ class VITSGenerator(torch.nn.Module):
             alpha (float): Alpha parameter to control the speed of generated speech.
             max_len (Optional[int]): Maximum length of acoustic feature sequence.
             use_teacher_forcing (bool): Whether to use teacher forcing.
+            inference_dtype (Optional[torch.dtype]): If specified (e.g.,
+                torch.bfloat16), run flow and decoder under autocast with this
+                dtype. Durations and sampling are still computed in float32.
+            use_cuda_graph (bool): Whether to run flow and decoder by replaying
+                CUDA graphs captured for each input shape. Only effective on GPU.
+            return_alignment (bool): Whether to return the monotonic attention
+                weight. If False, the attention weight is not built in inference
+                without teacher forcing and None is returned instead.
+            out (Optional[Tensor]): Buffer to write the generated waveform into
+                (B, 1, T_wav). It must have the shape of the generated waveform,
+                e.g., T_wav = max_len * upsample_factor with the fixed length
+                inputs. Only used in inference without teacher forcing.
 
         Returns:
             Tensor: Generated waveform tensor (B, T_wav).
-            Tensor: Monotonic attention weight tensor (B, T_feats, T_text).
+            Optional[Tensor]: Monotonic attention weight tensor (B, T_feats, T_text).
             Tensor: Duration tensor (B, T_text).
 
         """
@@ -456,7 +555,8 @@ class VITSGenerator(torch.nn.Module):
             g = self.global_emb(sids.view(-1)).unsqueeze(-1)
         if self.spk_embed_dim is not None:
             # (B, global_channels, 1)
-            g_ = self.spemb_proj(F.normalize(spembs.unsqueeze(0))).unsqueeze(-1)
+            spembs = spembs.view(-1, self.spk_embed_dim)
+            g_ = self.spemb_proj(F.normalize(spembs)).unsqueeze(-1)
             if g is None:
                 g = g_
             else:
@@ -477,31 +577,8 @@ class VITSGenerator(torch.nn.Module):
             z_p = self.flow(z, y_mask, g=g)  # (B, H, T_feats)
 
             # monotonic alignment search
-            s_p_sq_r = torch.exp(-2 * logs_p)  # (B, H, T_text)
-            # (B, 1, T_text)
-            neg_x_ent_1 = torch.sum(
-                -0.5 * math.log(2 * math.pi) - logs_p,
-                [1],
-                keepdim=True,
-            )
-            # (B, T_feats, H) x (B, H, T_text) = (B, T_feats, T_text)
-            neg_x_ent_2 = torch.matmul(
-                -0.5 * (z_p**2).transpose(1, 2),
-                s_p_sq_r,
-            )
-            # (B, T_feats, H) x (B, H, T_text) = (B, T_feats, T_text)
-            neg_x_ent_3 = torch.matmul(
-                z_p.transpose(1, 2),
-                (m_p * s_p_sq_r),
-            )
-            # (B, 1, T_text)
-            neg_x_ent_4 = torch.sum(
-                -0.5 * (m_p**2) * s_p_sq_r,
-                [1],
-                keepdim=True,
-            )
-            # (B, T_feats, T_text)
-            neg_x_ent = neg_x_ent_1 + neg_x_ent_2 + neg_x_ent_3 + neg_x_ent_4
+            # negative cross-entropy: (B, T_feats, T_text)
+            neg_x_ent = self._calculate_neg_x_ent(z_p, m_p, logs_p)
             # (B, 1, T_feats, T_text)
             attn_mask = torch.unsqueeze(x_mask, 2) * torch.unsqueeze(y_mask, -1)
             # monotonic attention weight: (B, 1, T_feats, T_text)
@@ -527,48 +604,223 @@ class VITSGenerator(torch.nn.Module):
                 dur = torch.ceil(w)
             y_lengths = torch.clamp_min(torch.sum(dur, [1, 2]), 1).long()
             y_mask = make_non_pad_mask(y_lengths).unsqueeze(1).to(text.device)
-            attn_mask = torch.unsqueeze(x_mask, 2) * torch.unsqueeze(y_mask, -1)
-            attn = self._generate_path(dur, attn_mask)
+            idx = self._generate_path_index(dur, y_mask.size(-1))  # (B, T_feats)
+            attn = None
+            if return_alignment:
+                attn_mask = torch.unsqueeze(x_mask, 2) * torch.unsqueeze(y_mask, -1)
+                attn = self._generate_path(idx, attn_mask)
 
             # expand the length to match with the feature sequence
-            # (B, T_feats, T_text) x (B, T_text, H) -> (B, H, T_feats)
-            m_p = torch.matmul(
-                attn.squeeze(1),
-                m_p.transpose(1, 2),
-            ).transpose(1, 2)
-            # (B, T_feats, T_text) x (B, T_text, H) -> (B, H, T_feats)
-            logs_p = torch.matmul(
-                attn.squeeze(1),
-                logs_p.transpose(1, 2),
-            ).transpose(1, 2)
+            m_p, logs_p = self._expand_prior(m_p, logs_p, idx, x_mask, y_mask)
 
             # decoder
-            z_p = m_p + torch.randn_like(m_p) * torch.exp(logs_p) * noise_scale
+            if use_cuda_graph and m_p.is_cuda:
+                if self._cuda_graph_decode is None:
+                    self._cuda_graph_decode = CUDAGraphRunner(self._decode)
+                wav = self._cuda_graph_decode(
+                    m_p, logs_p, y_mask, g, noise_scale, max_len, inference_dtype
+                )
+                if out is not None:
+                    wav = out.copy_(wav)
+            else:
+                wav = self._decode(
+                    m_p, logs_p, y_mask, g, noise_scale, max_len, inference_dtype, out
+                )
+
+        if attn is not None:
+            attn = attn.squeeze(1)
+        return wav.squeeze(1), attn, dur.squeeze(1)
+
+    def inference_batch(
+        self,
+        texts: List[torch.Tensor],
+        sids: Optional[torch.Tensor] = None,
+        spembs: Optional[torch.Tensor] = None,
+        lids: Optional[torch.Tensor] = None,
+        noise_scale: float = 0.667,
+        noise_scale_dur: float = 0.8,
+        alpha: float = 1.0,
+        inference_dtype: Optional[torch.dtype] = None,
+        use_cuda_graph: bool = False,
+    ) -> List[torch.Tensor]:
+        """Run inference for multiple utterances at once.
+
+        The texts are padded into a single batch so that the flow and the decoder
+        are run only once, and the generated waveforms are trimmed to their own
+        lengths. Note that the outputs are not exactly the same as those of the
+        single-utterance inference, since the padding is not masked in some
+        modules: with the conformer convolution in the text encoder, the padded
+        frames change the predicted durations, and the decoder lets the padding
+        affect the last few frames of the waveforms shorter than the longest one.
+
+        Args:
+            texts (List[Tensor]): List of input text index tensors (T_text,).
+            sids (Optional[Tensor]): Speaker index tensor (B,) or (B, 1).
+            spembs (Optional[Tensor]): Speaker embedding tensor (B, spk_embed_dim).
+            lids (Optional[Tensor]): Language index tensor (B,) or (B, 1).
+            noise_scale (float): Noise scale parameter for flow.
+            noise_scale_dur (float): Noise scale parameter for duration predictor.
+            alpha (float): Alpha parameter to control the speed of generated speech.
+            inference_dtype (Optional[torch.dtype]): If specified (e.g.,
+                torch.bfloat16), run flow and decoder under autocast with this
+                dtype.
+            use_cuda_graph (bool): Whether to run flow and decoder by replaying
+                CUDA graphs captured for each input shape. Only effective on GPU.
+
+        Returns:
+            List[Tensor]: List of generated waveform tensors (T_wav,).
+
+        """
+        text_lengths = torch.tensor(
+            [len(text) for text in texts], dtype=torch.long, device=texts[0].device
+        )
+        wav, _, dur = self.inference(
+            text=pad_list(texts, 0),
+            text_lengths=text_lengths,
+            sids=sids,
+            spembs=spembs,
+            lids=lids,
+            noise_scale=noise_scale,
+            noise_scale_dur=noise_scale_dur,
+            alpha=alpha,
+            inference_dtype=inference_dtype,
+            use_cuda_graph=use_cuda_graph,
+            return_alignment=False,
+        )
+        feats_lengths = torch.clamp_min(dur.sum(1), 1).long()
+        wav_lengths = (feats_lengths * self.upsample_factor).tolist()
+        return [w[:wav_length] for w, wav_length in zip(wav, wav_lengths)]
+
+    def _decode(
+        self,
+        m_p: torch.Tensor,
+        logs_p: torch.Tensor,
+        y_mask: torch.Tensor,
+        g: Optional[torch.Tensor],
+        noise_scale: float,
+        max_len: Optional[int],
+        inference_dtype: Optional[torch.dtype] = None,
+        out: Optional[torch.Tensor] = None,
+    ) -> torch.Tensor:
+        """Sample latent from prior and decode it into waveform.
+
+        Args:
+            m_p (Tensor): Expanded prior mean tensor (B, H, T_feats).
+            logs_p (Tensor): Expanded prior scale tensor (B, H, T_feats).
+            y_mask (Tensor): Feature mask tensor (B, 1, T_feats).
+            g (Optional[Tensor]): Global conditioning tensor (B, global_channels, 1).
+            noise_scale (float): Noise scale parameter for flow.
+            max_len (Optional[int]): Maximum length of acoustic feature sequence.
+            inference_dtype (Optional[torch.dtype]): Autocast dtype of flow and
+                decoder. If None, run them in the default dtype.
+            out (Optional[Tensor]): Buffer to write the waveform into (B, 1, T_wav).
+
+        Returns:
+            Tensor: Generated waveform tensor (B, 1, T_wav).
+
+        """
+        # NOTE: keep the sampling in float32 for the stability of exp(logs_p)
+        z_p = self._sample_from_prior(m_p, logs_p, noise_scale)
+        with get_autocast_context(z_p.device.type, inference_dtype):
             z = self.flow(z_p, y_mask, g=g, inverse=True)
-            wav = self.decoder((z * y_mask)[:, :, :max_len], g=g)
+            wav = self.decoder((z * y_mask)[:, :, :max_len], g=g, out=out)
+        return wav.float()
 
-        return wav.squeeze(1), attn.squeeze(1), dur.squeeze(1)
+    def _calculate_neg_x_ent(
+        self, z_p: torch.Tensor, m_p: torch.Tensor, logs_p: torch.Tensor
+    ) -> torch.Tensor:
+        """Calculate negative cross-entropy for monotonic alignment search.
 
-    def _generate_path(self, dur: torch.Tensor, mask: torch.Tensor) -> torch.Tensor:
-        """Generate path a.k.a. monotonic attention.
+        Args:
+            z_p (Tensor): Flow hidden representation (B, H, T_feats).
+            m_p (Tensor): Text encoder projected mean (B, H, T_text).
+            logs_p (Tensor): Text encoder projected scale (B, H, T_text).
+
+        Returns:
+            Tensor: Negative cross-entropy tensor (B, T_feats, T_text).
+
+        """
+        s_p_sq_r = torch.exp(-2 * logs_p)  # (B, H, T_text)
+        # terms independent of z_p: (B, 1, T_text)
+        neg_x_ent_14 = torch.sum(
+            -0.5 * _LOG_2PI - logs_p - 0.5 * (m_p**2) * s_p_sq_r,
+            [1],
+            keepdim=True,
+        )
+        # terms depending on z_p are calculated with a single matmul
+        # (B, T_feats, 2H) x (B, 2H, T_text) = (B, T_feats, T_text)
+        neg_x_ent_23 = torch.matmul(
+            torch.cat([-0.5 * (z_p**2), z_p], dim=1).transpose(1, 2),
+            torch.cat([s_p_sq_r, m_p * s_p_sq_r], dim=1),
+        )
+        return neg_x_ent_23 + neg_x_ent_14
+
+    def _generate_path_index(self, dur: torch.Tensor, t_feats: int) -> torch.Tensor:
+        """Generate the index of the aligned text for each frame.
 
         Args:
             dur (Tensor): Duration tensor (B, 1, T_text).
+            t_feats (int): Length of feature sequence.
+
+        Returns:
+            LongTensor: Index tensor (B, T_feats). Frames exceeding the total
+                duration have the index T_text.
+
+        """
+        if (
+            self._frames is None
+            or self._frames.size(0) < t_feats
+            or self._frames.device != dur.device
+        ):
+            # round up to a power of two to avoid the frequent reallocation
+            size = 1 << (t_feats - 1).bit_length()
+            self._frames = torch.arange(size, dtype=torch.int32, device=dur.device)
+        return _generate_path_index(dur, self._frames[:t_feats])
+
+    def _generate_path(self, idx: torch.Tensor, mask: torch.Tensor) -> torch.Tensor:
+        """Generate path a.k.a. monotonic attention.
+
+        Args:
+            idx (LongTensor): Index tensor of the aligned text (B, T_feats).
             mask (Tensor): Attention mask tensor (B, 1, T_feats, T_text).
 
         Returns:
             Tensor: Path tensor (B, 1, T_feats, T_text).
 
         """
-        b, _, t_y, t_x = mask.shape
-        cum_dur = torch.cumsum(dur, -1)
-        cum_dur_flat = cum_dur.view(b * t_x)
-        path = torch.arange(t_y, dtype=dur.dtype, device=dur.device)
-        path = path.unsqueeze(0) < cum_dur_flat.unsqueeze(1)
-        path = path.view(b, t_x, t_y).to(dtype=mask.dtype)
-        # path will be like (t_x = 3, t_y = 5):
-        # [[[1., 1., 0., 0., 0.],      [[[1., 1., 0., 0., 0.],
-        #   [1., 1., 1., 1., 0.],  -->   [0., 0., 1., 1., 0.],
-        #   [1., 1., 1., 1., 1.]]]       [0., 0., 0., 0., 1.]]]
-        path = path - F.pad(path, [0, 0, 1, 0, 0, 0])[:, :-1]
-        return path.unsqueeze(1).transpose(2, 3) * mask
+        return _generate_path(idx, mask)
+
+    def _expand_prior(
+        self,
+        m_p: torch.Tensor,
+        logs_p: torch.Tensor,
+        idx: torch.Tensor,
+        x_mask: torch.Tensor,
+        y_mask: torch.Tensor,
+    ) -> Tuple[torch.Tensor, torch.Tensor]:
+        """Expand the prior statistics of the text to the feature length.
+
+        This is equivalent to the multiplication with the path, but the statistics
+        of the aligned text are gathered for each frame instead.
+
+        Args:
+            m_p (Tensor): Text encoder projected mean (B, H, T_text).
+            logs_p (Tensor): Text encoder projected scale (B, H, T_text).
+            idx (LongTensor): Index tensor of the aligned text (B, T_feats).
+            x_mask (Tensor): Text mask tensor (B, 1, T_text).
+            y_mask (Tensor): Feature mask tensor (B, 1, T_feats).
+
+        Returns:
+            Tensor: Expanded mean tensor (B, H, T_feats).
+            Tensor: Expanded scale tensor (B, H, T_feats).
+
+        """
+        t_x = x_mask.size(-1)
+        is_valid = idx < t_x
+        idx = idx.clamp(max=t_x - 1)
+        is_valid = is_valid & x_mask.squeeze(1).gather(1, idx).bool()
+        is_valid = (is_valid & y_mask.squeeze(1).bool()).unsqueeze(1)
+        idx = idx.unsqueeze(1).expand(-1, m_p.size(1), -1)
+        m_p = torch.gather(m_p, 2, idx).masked_fill(~is_valid, 0.0)
+        logs_p = torch.gather(logs_p, 2, idx).masked_fill(~is_valid, 0.0)
+        return m_p, logs_p
@@ -8,6 +8,7 @@ import warnings
 
 import numpy as np
 import torch
+import torch.nn.functional as F
 from numba import njit, prange
 
 try:
@@ -22,6 +23,13 @@ except ImportError:
         "`cd espnet2/gan_tts/vits/monotonic_align; python setup.py build_ext --inplace`"
     )
 
+try:
+    from super_monotonic_align import maximum_path as maximum_path_triton_
+
+    is_super_monotonic_align_available = True
+except ImportError:
+    is_super_monotonic_align_available = False
+
 
 def maximum_path(neg_x_ent: torch.Tensor, attn_mask: torch.Tensor) -> torch.Tensor:
     """Calculate maximum path.
@@ -47,6 +55,77 @@ def maximum_path(neg_x_ent: torch.Tensor, attn_mask: torch.Tensor) -> torch.Tens
     return torch.from_numpy(path).to(device=device, dtype=dtype)
 
 
+def maximum_path_torch(
+    neg_x_ent: torch.Tensor, attn_mask: torch.Tensor
+) -> torch.Tensor:
+    """Calculate maximum path on the device of the input tensor.
+
+    Unlike :func:`maximum_path`, this does not copy the tensors to the host.
+    The dynamic programming is vectorized over the batch and text axes and
+    iterates over the feature axis.
+
+    Args:
+        neg_x_ent (Tensor): Negative X entropy tensor (B, T_feats, T_text).
+        attn_mask (Tensor): Attention mask (B, T_feats, T_text).
+
+    Returns:
+        Tensor: Maximum path tensor (B, T_feats, T_text).
+
+    """
+    b, t_y_max, t_x_max = neg_x_ent.shape
+    device, dtype = neg_x_ent.device, neg_x_ent.dtype
+    value = neg_x_ent.detach().to(torch.float32).clone()
+    t_ys = attn_mask.sum(1)[:, 0].long()
+    t_xs = attn_mask.sum(2)[:, 0].long()
+    max_neg_val = float("-inf")
+
+    # forward: value[y, x] += max(value[y - 1, x - 1], value[y - 1, x])
+    # NOTE: the cells above the diagonal (x > y) are kept as -inf,
+    #   which corresponds to `v_cur = max_neg_val if x == y` in cython version
+    prev = value.new_full((b, t_x_max), max_neg_val)
+    for y in range(t_y_max):
+        v_prev = F.pad(prev[:, :-1], [1, 0], value=0.0 if y == 0 else max_neg_val)
+        value[:, y] += torch.maximum(v_prev, prev)
+        prev = value[:, y]
+
+    # backtrack
+    path = torch.zeros_like(value)
+    batch_idxs = torch.arange(b, device=device)
+    index = t_xs - 1
+    for y in range(t_y_max - 1, -1, -1):
+        is_valid = y < t_ys
+        path[batch_idxs, y, index] = is_valid.to(path.dtype)
+        if y == 0:
+            break
+        v_cur = value[batch_idxs, y - 1, index]
+        v_prev = value[batch_idxs, y - 1, (index - 1).clamp(min=0)]
+        is_moved = is_valid & (index != 0) & ((index == y) | (v_cur < v_prev))
+        index = index - is_moved.long()
+
+    return path.to(dtype=dtype)
+
+
+def maximum_path_triton(
+    neg_x_ent: torch.Tensor, attn_mask: torch.Tensor
+) -> torch.Tensor:
+    """Calculate maximum path with the Triton kernel of super-monotonic-align.
+
+    Args:
+        neg_x_ent (Tensor): Negative X entropy tensor (B, T_feats, T_text).
+        attn_mask (Tensor): Attention mask (B, T_feats, T_text).
+
+    Returns:
+        Tensor: Maximum path tensor (B, T_feats, T_text).
+
+    """
+    # NOTE: super-monotonic-align takes the inputs in (B, T_text, T_feats) order
+    path = maximum_path_triton_(
+        neg_x_ent.detach().transpose(1, 2).contiguous().to(torch.float32),
+        attn_mask.transpose(1, 2).contiguous().to(torch.int32),
+    )
+    return path.transpose(1, 2).to(dtype=neg_x_ent.dtype)
+
+
 @njit
 def maximum_path_each_numba(path, value, t_y, t_x, max_neg_val=-np.inf):
     """Calculate a single maximum path with numba."""
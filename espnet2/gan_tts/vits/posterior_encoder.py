@@ -39,6 +39,7 @@ class PosteriorEncoder(torch.nn.Module):
         dropout_rate: float = 0.0,
         bias: bool = True,
         use_weight_norm: bool = True,
+        use_space_to_batch: bool = False,
     ):
         """Initilialize PosteriorEncoder module.
 
@@ -54,6 +55,8 @@ class PosteriorEncoder(torch.nn.Module):
             dropout_rate (float): Dropout rate.
             bias (bool): Whether to use bias parameters in conv.
             use_weight_norm (bool): Whether to apply weight norm.
+            use_space_to_batch (bool): Whether to compute the dilated convolutions
+                with space-to-batch transform.
 
         """
         super().__init__()
@@ -79,6 +82,7 @@ class PosteriorEncoder(torch.nn.Module):
             use_last_conv=False,
             scale_residual=False,
             scale_skip_connect=True,
+            use_space_to_batch=use_space_to_batch,
         )
         self.proj = Conv1d(hidden_channels, out_channels * 2, 1)
 
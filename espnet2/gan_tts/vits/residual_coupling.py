@@ -40,6 +40,7 @@ class ResidualAffineCouplingBlock(torch.nn.Module):
         use_weight_norm: bool = True,
         bias: bool = True,
         use_only_mean: bool = True,
+        use_space_to_batch: bool = False,
     ):
         """Initilize ResidualAffineCouplingBlock module.
 
@@ -56,6 +57,8 @@ class ResidualAffineCouplingBlock(torch.nn.Module):
             use_weight_norm (bool): Whether to use weight normalization in WaveNet.
             bias (bool): Whether to use bias paramters in WaveNet.
             use_only_mean (bool): Whether to estimate only mean.
+            use_space_to_batch (bool): Whether to compute the dilated convolutions
+                with space-to-batch transform in WaveNet.
 
         """
         super().__init__()
@@ -75,6 +78,7 @@ class ResidualAffineCouplingBlock(torch.nn.Module):
                     use_weight_norm=use_weight_norm,
                     bias=bias,
                     use_only_mean=use_only_mean,
+                    use_space_to_batch=use_space_to_batch,
                 )
             ]
             self.flows += [FlipFlow()]
@@ -123,6 +127,7 @@ class ResidualAffineCouplingLayer(torch.nn.Module):
         use_weight_norm: bool = True,
         bias: bool = True,
         use_only_mean: bool = True,
+        use_space_to_batch: bool = False,
     ):
         """Initialzie ResidualAffineCouplingLayer module.
 
@@ -138,6 +143,8 @@ class ResidualAffineCouplingLayer(torch.nn.Module):
             use_weight_norm (bool): Whether to use weight normalization in WaveNet.
             bias (bool): Whether to use bias paramters in WaveNet.
             use_only_mean (bool): Whether to estimate only mean.
+            use_space_to_batch (bool): Whether to compute the dilated convolutions
+                with space-to-batch transform in WaveNet.
 
         """
         assert in_channels % 2 == 0, "in_channels should be divisible by 2"
@@ -170,6 +177,7 @@ class ResidualAffineCouplingLayer(torch.nn.Module):
             use_last_conv=False,
             scale_residual=False,
             scale_skip_connect=True,
+            use_space_to_batch=use_space_to_batch,
         )
         if use_only_mean:
             self.proj = torch.nn.Conv1d(
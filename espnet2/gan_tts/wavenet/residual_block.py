@@ -28,6 +28,49 @@ class Conv1d(torch.nn.Conv1d):
             torch.nn.init.constant_(self.bias, 0.0)
 
 
+class SpaceToBatchConv1d(Conv1d):
+    """Dilated Conv1d module computed with space-to-batch transform.
+
+    The input is split into ``dilation`` interleaved sub-sequences, which are
+    convolved as a batch without dilation and then merged back. The output and the
+    parameters are the same as those of the dilated Conv1d, but the memory access
+    of the convolution becomes contiguous. Only "same" padding is supported.
+
+    """
+
+    def __init__(self, *args, **kwargs):
+        """Initialize SpaceToBatchConv1d module."""
+        super().__init__(*args, **kwargs)
+        assert (
+            self.padding[0] == (self.kernel_size[0] - 1) // 2 * self.dilation[0]
+        ), "Only same padding is supported."
+
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        """Calculate forward propagation.
+
+        Args:
+            x (Tensor): Input tensor (B, in_channels, T).
+
+        Returns:
+            Tensor: Output tensor (B, out_channels, T).
+
+        """
+        dilation = self.dilation[0]
+        if dilation == 1:
+            return super().forward(x)
+
+        b, c, t = x.size()
+        x = F.pad(x, (0, -t % dilation))
+        # (B, C, T') -> (B * dilation, C, T' // dilation)
+        x = x.view(b, c, -1, dilation).permute(0, 3, 1, 2).reshape(b * dilation, c, -1)
+        x = F.conv1d(x, self.weight, self.bias, padding=self.padding[0] // dilation)
+        # (B * dilation, C', T' // dilation) -> (B, C', T')
+        x = x.view(b, dilation, x.size(1), x.size(2)).permute(0, 2, 3, 1)
+        x = x.reshape(b, x.size(1), -1)
+
+        return x[:, :, :t]
+
+
 class Conv1d1x1(Conv1d):
     """1x1 Conv1d with customized initialization."""
 
@@ -53,6 +96,7 @@ class ResidualBlock(torch.nn.Module):
         dilation: int = 1,
         bias: bool = True,
         scale_residual: bool = False,
+        use_space_to_batch: bool = False,
     ):
         """Initialize ResidualBlock module.
 
@@ -65,6 +109,8 @@ class ResidualBlock(torch.nn.Module):
             dilation (int): Dilation factor.
             bias (bool): Whether to add bias parameter in convolution layers.
             scale_residual (bool): Whether to scale the residual outputs.
+            use_space_to_batch (bool): Whether to compute the dilation convolution
+                with space-to-batch transform.
 
         """
         super().__init__()
@@ -79,7 +125,8 @@ class ResidualBlock(torch.nn.Module):
 
         # dilation conv
         padding = (kernel_size - 1) // 2 * dilation
-        self.conv = Conv1d(
+        conv_class = SpaceToBatchConv1d if use_space_to_batch else Conv1d
+        self.conv = conv_class(
             residual_channels,
             gate_channels,
             kernel_size,
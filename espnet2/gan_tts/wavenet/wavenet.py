@@ -39,6 +39,7 @@ class WaveNet(torch.nn.Module):
         use_last_conv: bool = False,
         scale_residual: bool = False,
         scale_skip_connect: bool = False,
+        use_space_to_batch: bool = False,
     ):
         """Initialize WaveNet module.
 
@@ -62,6 +63,8 @@ class WaveNet(torch.nn.Module):
             use_last_conv (bool): Whether to use the last conv layers.
             scale_residual (bool): Whether to scale the residual outputs.
             scale_skip_connect (bool): Whether to scale the skip connection outputs.
+            use_space_to_batch (bool): Whether to compute the dilated convolutions
+                with space-to-batch transform.
 
         """
         super().__init__()
@@ -96,6 +99,7 @@ class WaveNet(torch.nn.Module):
                 dropout_rate=dropout_rate,
                 bias=bias,
                 scale_residual=scale_residual,
+                use_space_to_batch=use_space_to_batch,
             )
             self.conv_layers += [conv]
 
@@ -0,0 +1,54 @@
+#  Apache 2.0 (http://www.apache.org/licenses/LICENSE-2.0)
+
+"""Test VISinger length regulator module."""
+
+import warnings
+
+import pytest
+import torch
+
+from espnet2.gan_svs.vits.length_regulator import LengthRegulator
+
+
+def reference_length_regulator(xs, notepitch, ds, pad_value):
+    outputs = [torch.repeat_interleave(x, d, dim=1) for x, d in zip(xs, ds)]
+    pitches = [torch.repeat_interleave(n, d, dim=0) for n, d in zip(notepitch, ds)]
+    x_lengths = torch.tensor([p.size(0) for p in pitches], dtype=torch.long)
+    max_len = int(x_lengths.max())
+    output = xs.new_full((xs.size(0), xs.size(1), max_len), pad_value)
+    frame_pitch = notepitch.new_full((notepitch.size(0), max_len), pad_value)
+    for i, (o, p) in enumerate(zip(outputs, pitches)):
+        output[i, :, : o.size(1)] = o
+        frame_pitch[i, : p.size(0)] = p
+    return output, frame_pitch, x_lengths
+
+
+@pytest.mark.parametrize("use_jit", [False, True])
+@pytest.mark.parametrize("pad_value", [0.0, -1.0])
+@pytest.mark.parametrize(
+    "ds",
+    [
+        [[1, 0, 3, 2, 0], [0, 2, 0, 0, 1], [0, 0, 0, 0, 0]],
+        [[0, 0, 0, 0, 0], [0, 0, 0, 0, 0], [0, 0, 0, 0, 0]],
+    ],
+)
+def test_length_regulator(ds, pad_value, use_jit):
+    lr = LengthRegulator(pad_value)
+    if use_jit:
+        lr = torch.jit.script(lr)
+    ds = torch.tensor(ds, dtype=torch.long)
+    xs = torch.randn(ds.size(0), 4, ds.size(1))
+    notepitch = torch.randint(1, 128, ds.size())
+    x_lengths = torch.tensor([5, 4, 2], dtype=torch.long)
+
+    ds_ = ds.clone()
+    if ds.sum() == 0:
+        # all 0 sequences are filled with 1
+        ds_[:] = 1
+    # ignore the warning about all 0 sequences
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        outputs = lr(xs, notepitch, ds, x_lengths)
+    expected = reference_length_regulator(xs, notepitch, ds_, pad_value)
+    for output, expected_output in zip(outputs, expected):
+        torch.testing.assert_close(output, expected_output)
@@ -6,8 +6,12 @@
 
 import pytest
 import torch
+from packaging.version import parse as V
 
 from espnet2.gan_svs.vits.generator import VITSGenerator
+from espnet.nets.pytorch_backend.transformer.attention import is_sdpa_available
+
+is_torch_1_10_plus = V(torch.__version__) >= V("1.10.0")
 
 
 def make_generator_args(**kwargs):
@@ -77,6 +81,7 @@ def make_generator_args(**kwargs):
         ({}),
         ({"text_encoder_positionwise_layer_type": "linear"}),
         ({"text_encoder_positionwise_layer_type": "conv1d-linear"}),
+        ({"text_encoder_positionwise_conv_kernel_size": 3}),
         ({"text_encoder_normalize_before": False}),
         ({"use_macaron_style_in_text_encoder": False}),
         ({"use_conformer_conv_in_text_encoder": False}),
@@ -88,6 +93,12 @@ def make_generator_args(**kwargs):
         ),
         ({"spk_embed_dim": 16, "global_channels": 4}),
         ({"langs": 16, "global_channels": 4}),
+        pytest.param(
+            {"use_sdpa_in_text_encoder": True},
+            marks=pytest.mark.skipif(
+                not is_sdpa_available, reason="requires torch>=2.0.0"
+            ),
+        ),
     ],
 )
 def test_vits_generator_forward(model_dict):
@@ -392,3 +403,109 @@ def test_multi_speaker_vits_generator_forward(model_dict):
         inputs["lids"] = torch.randint(0, args["langs"], (1,))
     output = model.inference(**inputs, use_teacher_forcing=True)
     assert output.size(1) == inputs["feats"].size(2) * model.upsample_factor
+
+
+@pytest.mark.skipif(
+    "1.6" in torch.__version__,
+    reason="group conv in pytorch 1.6 has an issue. "
+    "See https://github.com/pytorch/pytorch/issues/42446.",
+)
+@torch.no_grad()
+@pytest.mark.parametrize(
+    "label_length, label_lengths",
+    [
+        # labels are padded to the feature length
+        (8, [8, 5]),
+        # labels are truncated to the feature length
+        (20, [20, 12]),
+    ],
+)
+def test_vits_generator_forward_without_dp(label_length, label_lengths):
+    idim = 10
+    odim = 5
+    args = make_generator_args(vocabs=idim, aux_channels=odim, use_dp=False)
+    model = VITSGenerator(**args)
+
+    inputs = dict(
+        text=torch.randint(0, idim, (2, label_length)),
+        text_lengths=torch.tensor(label_lengths, dtype=torch.long),
+        feats=torch.randn(2, odim, 16),
+        feats_lengths=torch.tensor([16, 13], dtype=torch.long),
+        label=torch.randint(0, idim, (2, label_length)),
+        label_lengths=torch.tensor(label_lengths, dtype=torch.long),
+        melody=torch.randint(0, 127, (2, label_length)),
+        melody_lengths=torch.tensor(label_lengths, dtype=torch.long),
+        beat=torch.randint(1, idim, (2, label_length)),
+        beat_lengths=torch.tensor(label_lengths, dtype=torch.long),
+        pitch=torch.randn(2, 16, 1),
+        pitch_lengths=torch.tensor([16, 13], dtype=torch.long),
+    )
+    outputs = model(**inputs)
+    # text encoder outputs are aligned with the feature length
+    x_mask = outputs[2]
+    assert x_mask.size(-1) == inputs["feats"].size(2)
+    for i, output in enumerate(outputs):
+        if not isinstance(output, tuple):
+            print(f"{i+1}: {output.shape}")
+        else:
+            for j, output_ in enumerate(output):
+                print(f"{i+j+1}: {output_.shape}")
+
+
+@pytest.mark.skipif(not is_torch_1_10_plus, reason="Require torch>=1.10.0")
+@torch.no_grad()
+@pytest.mark.parametrize(
+    "model_dict",
+    [
+        # NOTE: durations are not predicted so that the shapes do not depend on
+        #   the precision
+        ({"use_dp": False}),
+        ({"use_visinger": False}),
+    ],
+)
+def test_vits_generator_inference_dtype(model_dict):
+    idim = 10
+    args = make_generator_args(vocabs=idim, **model_dict)
+    model = VITSGenerator(**args).eval()
+    inputs = dict(
+        text=torch.randint(0, idim, (2, 5)),
+        text_lengths=torch.tensor([5, 3], dtype=torch.long),
+        label=torch.randint(0, idim, (2, 5)),
+        label_lengths=torch.tensor([5, 3], dtype=torch.long),
+        melody=torch.randint(0, 127, (2, 5)),
+        beat=torch.randint(1, idim, (2, 5)),
+        noise_scale=0.0,
+    )
+    output = model.inference(**inputs)
+    output_bf16 = model.inference(**inputs, inference_dtype=torch.bfloat16)
+    assert output_bf16.dtype == torch.float32
+    assert output_bf16.shape == output.shape
+
+
+@pytest.mark.skipif(
+    not torch.cuda.is_available() or not torch.cuda.is_bf16_supported(),
+    reason="Require cuda with bfloat16 support",
+)
+@torch.no_grad()
+def test_vits_generator_inference_cuda_graph():
+    idim = 10
+    args = make_generator_args(vocabs=idim)
+    model = VITSGenerator(**args).cuda().eval()
+    inputs = dict(
+        text=torch.randint(0, idim, (2, 5), device="cuda"),
+        text_lengths=torch.tensor([5, 3], dtype=torch.long, device="cuda"),
+        label=torch.randint(0, idim, (2, 5), device="cuda"),
+        label_lengths=torch.tensor([5, 3], dtype=torch.long, device="cuda"),
+        melody=torch.randint(0, 127, (2, 5), device="cuda"),
+        beat=torch.randint(1, idim, (2, 5), device="cuda"),
+        noise_scale=0.0,
+        inference_dtype=torch.bfloat16,
+    )
+    expected = model.inference(**inputs)
+    # the graph is captured in the first call and replayed in the second call,
+    # after the memory freed by the first call is overwritten
+    for _ in range(2):
+        output = model.inference(**inputs, use_cuda_graph=True)
+        torch.testing.assert_close(output, expected, rtol=1e-2, atol=1e-2)
+        torch.full((1 << 20,), float("nan"), device="cuda")
+    assert len(model._cuda_graph_decode.graphs) == 1
@@ -5,8 +5,13 @@
 
 import pytest
 import torch
+from packaging.version import parse as V
 
+from espnet2.gan_tts.utils import CUDAGraphRunner
 from espnet2.gan_tts.vits.generator import VITSGenerator
+from espnet.nets.pytorch_backend.nets_utils import make_non_pad_mask, pad_list
+
+is_torch_1_10_plus = V(torch.__version__) >= V("1.10.0")
 
 
 def make_generator_args(**kwargs):
@@ -87,6 +92,7 @@ def make_generator_args(**kwargs):
         ),
         ({"spk_embed_dim": 16, "global_channels": 4}),
         ({"langs": 16, "global_channels": 4}),
+        ({"mas_type": "torch"}),
     ],
 )
 def test_vits_generator_forward(model_dict):
@@ -157,6 +163,12 @@ def test_vits_generator_forward(model_dict):
         inputs["lids"] = torch.randint(0, args["langs"], (1,))
     outputs = model.inference(**inputs)
     assert outputs[0].size(1) == inputs["dur"].sum() * model.upsample_factor
+    outputs_ = model.inference(**inputs, return_alignment=False)
+    assert outputs_[1] is None
+    assert outputs_[0].size(1) == outputs[0].size(1)
+    out = torch.empty(1, 1, outputs[0].size(1))
+    outputs_ = model.inference(**inputs, out=out)
+    assert outputs_[0].data_ptr() == out.data_ptr()
     for i, output in enumerate(outputs):
         if not isinstance(output, tuple):
             print(f"{i+1}: {output.shape}")
@@ -191,6 +203,29 @@ def test_vits_generator_forward(model_dict):
             for j, output_ in enumerate(output):
                 print(f"{i+j+1}: {output_.shape}")
 
+    # check batch inference
+    # NOTE: eval mode and zero noise make the predicted durations deterministic
+    model.eval()
+    inputs = dict(
+        texts=[torch.randint(0, idim, (5,)), torch.randint(0, idim, (3,))],
+        noise_scale=0.0,
+        noise_scale_dur=0.0,
+    )
+    if args["spk_embed_dim"] > 0:
+        inputs["spembs"] = torch.randn(2, args["spk_embed_dim"])
+    if args["langs"] > 0:
+        inputs["lids"] = torch.randint(0, args["langs"], (2,))
+    outputs = model.inference_batch(**inputs)
+    assert len(outputs) == len(inputs["texts"])
+    _, _, dur = model.inference(
+        text=pad_list(inputs.pop("texts"), 0),
+        text_lengths=torch.tensor([5, 3], dtype=torch.long),
+        **inputs,
+    )
+    for i, output in enumerate(outputs):
+        assert output.size(0) == dur[i].sum() * model.upsample_factor
+        print(f"{i+1}: {output.shape}")
+
 
 @pytest.mark.skipif(
     "1.6" in torch.__version__,
@@ -330,3 +365,118 @@ def test_multi_speaker_vits_generator_forward(model_dict):
         else:
             for j, output_ in enumerate(output):
                 print(f"{i+j+1}: {output_.shape}")
+
+
+@pytest.mark.skipif(
+    "1.6" in torch.__version__,
+    reason="group conv in pytorch 1.6 has an issue. "
+    "See https://github.com/pytorch/pytorch/issues/42446.",
+)
+@torch.no_grad()
+def test_vits_generator_inference_batch():
+    idim = 10
+    # NOTE: conformer conv and decoder are not masked, so the padding affects
+    #   the durations with conformer conv and the last few frames of waveform.
+    args = make_generator_args(vocabs=idim, use_conformer_conv_in_text_encoder=False)
+    model = VITSGenerator(**args).eval()
+    texts = [torch.randint(0, idim, (n,)) for n in [12, 4, 8]]
+    kwargs = dict(noise_scale=0.0, noise_scale_dur=0.0, alpha=4.0)
+    outputs = model.inference_batch(texts, **kwargs)
+    assert len(outputs) == len(texts)
+    max_len = max(output.size(0) for output in outputs)
+    # number of samples at the end that can be affected by the padding
+    margin = 8 * model.upsample_factor
+    for text, output in zip(texts, outputs):
+        wav, _, dur = model.inference(
+            text=text[None], text_lengths=torch.tensor([len(text)]), **kwargs
+        )
+        assert output.size(0) == wav.size(1) == dur.sum() * model.upsample_factor
+        n = output.size(0) if output.size(0) == max_len else output.size(0) - margin
+        torch.testing.assert_close(output[:n], wav[0, :n], rtol=1e-3, atol=1e-4)
+
+
+def reference_generate_path(dur, mask):
+    b, _, t_y, t_x = mask.shape
+    cum_dur = torch.cumsum(dur, -1)
+    cum_dur_flat = cum_dur.view(b * t_x)
+    path = torch.arange(t_y, dtype=dur.dtype, device=dur.device)
+    path = path.unsqueeze(0) < cum_dur_flat.unsqueeze(1)
+    path = path.view(b, t_x, t_y).to(dtype=mask.dtype)
+    path = path - torch.nn.functional.pad(path, [0, 0, 1, 0, 0, 0])[:, :-1]
+    return path.unsqueeze(1).transpose(2, 3) * mask
+
+
+@torch.no_grad()
+def test_vits_generator_generate_path():
+    model = VITSGenerator(**make_generator_args())
+    # durations with zeros, a padded text with non-zero duration, and all zeros
+    dur = torch.tensor(
+        [[[2, 0, 3, 1, 0]], [[0, 1, 0, 2, 2]], [[0, 0, 0, 0, 0]]],
+        dtype=torch.float,
+    )
+    x_mask = make_non_pad_mask(torch.tensor([5, 4, 3])).unsqueeze(1).float()
+    # the total durations are shorter than the feature length
+    y_mask = make_non_pad_mask(torch.tensor([7, 5, 1]), torch.zeros(3, 8))
+    y_mask = y_mask.unsqueeze(1).float()
+    attn_mask = torch.unsqueeze(x_mask, 2) * torch.unsqueeze(y_mask, -1)
+    path = reference_generate_path(dur, attn_mask)
+
+    idx = model._generate_path_index(dur, y_mask.size(-1))
+    torch.testing.assert_close(model._generate_path(idx, attn_mask), path)
+
+    m_p = torch.randn(3, 4, 5)
+    logs_p = torch.randn(3, 4, 5)
+    m_p_, logs_p_ = model._expand_prior(m_p, logs_p, idx, x_mask, y_mask)
+    attn = path.squeeze(1)
+    torch.testing.assert_close(
+        m_p_, torch.matmul(attn, m_p.transpose(1, 2)).transpose(1, 2)
+    )
+    torch.testing.assert_close(
+        logs_p_, torch.matmul(attn, logs_p.transpose(1, 2)).transpose(1, 2)
+    )
+
+
+@pytest.mark.skipif(not is_torch_1_10_plus, reason="Require torch>=1.10.0")
+@torch.no_grad()
+@pytest.mark.parametrize(
+    "model_dict",
+    [
+        ({}),
+        ({"spk_embed_dim": 16, "global_channels": 4}),
+    ],
+)
+def test_vits_generator_inference_dtype(model_dict):
+    idim = 10
+    args = make_generator_args(vocabs=idim, **model_dict)
+    model = VITSGenerator(**args).eval()
+    inputs = dict(
+        text=torch.randint(0, idim, (2, 5)),
+        text_lengths=torch.tensor([5, 3], dtype=torch.long),
+        noise_scale=0.0,
+        noise_scale_dur=0.0,
+    )
+    if args["spk_embed_dim"] > 0:
+        inputs["spembs"] = torch.randn(2, args["spk_embed_dim"])
+    wav, _, dur = model.inference(**inputs)
+    wav_bf16, _, dur_bf16 = model.inference(**inputs, inference_dtype=torch.bfloat16)
+    assert wav_bf16.dtype == torch.float32
+    assert wav_bf16.shape == wav.shape
+    torch.testing.assert_close(dur_bf16, dur)
+
+
+@pytest.mark.skipif(not torch.cuda.is_available(), reason="Require cuda")
+@torch.no_grad()
+def test_vits_generator_cuda_graph_decode():
+    args = make_generator_args()
+    model = VITSGenerator(**args).cuda().eval()
+    runner = CUDAGraphRunner(model._decode, max_graphs=1)
+    hidden_channels = args["hidden_channels"]
+    # the first shape is evicted by the second one and captured again
+    for feats_len in [8, 12, 8]:
+        m_p = torch.randn(2, hidden_channels, feats_len, device="cuda")
+        logs_p = torch.randn(2, hidden_channels, feats_len, device="cuda")
+        y_mask = torch.ones(2, 1, feats_len, device="cuda")
+        y_mask[1, :, -3:] = 0.0
+        inputs = (m_p, logs_p, y_mask, None, 0.0, None)
+        torch.testing.assert_close(runner(*inputs), model._decode(*inputs))
+        assert len(runner.graphs) == 1
@@ -0,0 +1,29 @@
+#  Apache 2.0 (http://www.apache.org/licenses/LICENSE-2.0)
+
+"""Test monotonic alignment search functions."""
+
+import pytest
+import torch
+
+from espnet2.gan_tts.vits.monotonic_align import maximum_path, maximum_path_torch
+
+
+@pytest.mark.parametrize(
+    "t_feats_lengths, t_text_lengths",
+    [
+        ([16, 13, 10], [8, 5, 10]),
+        ([7, 7], [7, 3]),
+        ([1], [1]),
+    ],
+)
+def test_maximum_path_torch(t_feats_lengths, t_text_lengths):
+    b = len(t_feats_lengths)
+    t_feats, t_text = max(t_feats_lengths), max(t_text_lengths)
+    neg_x_ent = torch.randn(b, t_feats, t_text)
+    attn_mask = torch.zeros(b, t_feats, t_text)
+    for i, (t_y, t_x) in enumerate(zip(t_feats_lengths, t_text_lengths)):
+        attn_mask[i, :t_y, :t_x] = 1.0
+    path = maximum_path_torch(neg_x_ent, attn_mask)
+    assert path.shape == neg_x_ent.shape
+    assert path.dtype == neg_x_ent.dtype
+    torch.testing.assert_close(path, maximum_path(neg_x_ent, attn_mask))
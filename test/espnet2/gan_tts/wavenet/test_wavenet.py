@@ -7,6 +7,7 @@ import pytest
 import torch
 
 from espnet2.gan_tts.wavenet import WaveNet
+from espnet2.gan_tts.wavenet.residual_block import Conv1d, SpaceToBatchConv1d
 
 
 def make_wavenet_args(**kwargs):
@@ -44,6 +45,7 @@ def make_wavenet_args(**kwargs):
         ({"aux_channels": 3}),
         ({"scale_residual": True}),
         ({"scale_skip_connect": True}),
+        ({"use_space_to_batch": True}),
     ],
 )
 def test_wavenet_forward(model_dict):
@@ -65,3 +67,20 @@ def test_wavenet_forward(model_dict):
         out.size(1) == args["out_channels"]
     else:
         out.size(1) == args["skip_channels"]
+
+
+@pytest.mark.parametrize("dilation", [1, 2, 3, 4])
+@pytest.mark.parametrize("kernel_size", [3, 5])
+@pytest.mark.parametrize("batch_length", [31, 32])
+def test_space_to_batch_conv1d(dilation, kernel_size, batch_length):
+    padding = (kernel_size - 1) // 2 * dilation
+    conv = Conv1d(4, 8, kernel_size, padding=padding, dilation=dilation)
+    s2b_conv = SpaceToBatchConv1d(4, 8, kernel_size, padding=padding, dilation=dilation)
+    s2b_conv.load_state_dict(conv.state_dict())
+    x = torch.randn(2, 4, batch_length)
+    torch.testing.assert_close(s2b_conv(x), conv(x), rtol=1e-4, atol=1e-5)
+
+
+def test_space_to_batch_conv1d_invalid_padding():
+    with pytest.raises(AssertionError):
+        SpaceToBatchConv1d(4, 8, 3, padding=1, dilation=2)
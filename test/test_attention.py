@@ -0,0 +1,45 @@
+import pytest
+import torch
+
+from espnet.nets.pytorch_backend.nets_utils import make_non_pad_mask
+from espnet.nets.pytorch_backend.transformer.attention import (
+    LegacyRelPositionMultiHeadedAttention,
+    MultiHeadedAttention,
+    RelPositionMultiHeadedAttention,
+    is_sdpa_available,
+)
+from espnet.nets.pytorch_backend.transformer.embedding import (
+    LegacyRelPositionalEncoding,
+    RelPositionalEncoding,
+)
+from espnet.nets.pytorch_backend.transformer.mask import subsequent_mask
+
+
+@pytest.mark.skipif(not is_sdpa_available, reason="Require sdpa")
+@pytest.mark.parametrize(
+    "attn_class, pos_enc_class",
+    [
+        (MultiHeadedAttention, None),
+        (RelPositionMultiHeadedAttention, RelPositionalEncoding),
+        (LegacyRelPositionMultiHeadedAttention, LegacyRelPositionalEncoding),
+    ],
+)
+@pytest.mark.parametrize("use_subsequent_mask", [False, True])
+@torch.no_grad()
+def test_attention_sdpa(attn_class, pos_enc_class, use_subsequent_mask):
+    n_head, n_feat = 2, 8
+    attn = attn_class(n_head, n_feat, 0.1).eval()
+    x = torch.randn(3, 7, n_feat)
+    mask = make_non_pad_mask(torch.tensor([7, 5, 2])).unsqueeze(1)  # (B, 1, T)
+    if use_subsequent_mask:
+        mask = mask & subsequent_mask(x.size(1)).unsqueeze(0)  # (B, T, T)
+    inputs = (x, x, x)
+    if pos_enc_class is not None:
+        x, pos_emb = pos_enc_class(n_feat, 0.0)(x)
+        inputs = (x, x, x, pos_emb)
+
+    attn.use_sdpa = False
+    expected = attn(*inputs, mask)
+    attn.use_sdpa = True
+    actual = attn(*inputs, mask)
+    torch.testing.assert_close(actual, expected, rtol=1e-4, atol=1e-5)